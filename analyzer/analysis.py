@@ -3,7 +3,9 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 from preprocessor import Preprocessor
 import requests
+import pyarrow as pa
 import io
+import json
 import base64
 sns.set_theme()
 pd.options.display.float_format = '{:,.2f}'.format
@@ -33,14 +35,36 @@ def run_analysis(filters):
         "price_heatmap": preprocessor.price_heatmap
     } 
 
+# Columns the preprocessor and the analysis use, in table order
+ANALYSIS_COLUMNS = ['operation', 'size', 'dorms', 'toilets', 'garage', 'price', 'additional_costs', 'type',
+                    'latitude', 'longitude']
+
+# Local copies of fetched datasets, keyed by filters: {key: (etag, df)}
+_fetched_data = {}
+_fetched_data_limit = 8
+
 def fetch_data(filters):
     try:
-        response = requests.post(f"http://api:8000/properties/filter", timeout=10, json=filters)
+        key = json.dumps(filters, sort_keys=True)
+        cached = _fetched_data.get(key)
+
+        # Revalidate the local copy, the API answers 304 when nothing changed
+        headers = {'If-None-Match': cached[0]} if cached else {}
+        response = requests.post(f"http://api:8000/properties/filter", params={"format": "arrow", "columns": ",".join(ANALYSIS_COLUMNS)}, timeout=10, json=filters, headers=headers)
+        if response.status_code == 304 and cached:
+            print(" [*] Data not modified, using local copy")
+            return cached[1].copy()
         response.raise_for_status() 
-        data = response.json()
 
-        # Convert to dataframe
-        df = pd.DataFrame(data)
+        # Convert to dataframe, reusing the Arrow buffers where possible
+        df = read_arrow(response.content)
+
+        # Keep a copy for the next request, dropping the oldest one
+        if 'ETag' in response.headers:
+            _fetched_data.pop(key, None)
+            if len(_fetched_data) >= _fetched_data_limit:
+                _fetched_data.pop(next(iter(_fetched_data)))
+            _fetched_data[key] = (response.headers['ETag'], df.copy())
         
         # Return dataframe
         return df
@@ -49,6 +73,11 @@ def fetch_data(filters):
         print(f"Error fetching data: {e}")
         return None
 
+def read_arrow(content):
+    """Build a DataFrame from an Arrow IPC stream without going through Python objects."""
+    reader = pa.ipc.open_stream(content)
+    return reader.read_pandas(split_blocks=True, self_destruct=True)
+
 def preprocess_data(df):
     preprocessor = Preprocessor()
     processed_df = preprocessor.process_df(df)
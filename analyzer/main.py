@@ -25,6 +25,22 @@ def create_connection():
                 raise e
             time.sleep(5)  # Wait 5 seconds before retrying
 
+def _json_default(value):
+    # numpy and pandas scalars
+    return value.item() if hasattr(value, 'item') else str(value)
+
+def send_reply(channel, properties, default_queue, status, payload):
+    """Publish a JSON reply, {"status": "completed", "result": ...} or {"status": "failed", "error": ...},
+    tagged with the request correlation id"""
+    key = 'result' if status == 'completed' else 'error'
+    channel.basic_publish(
+        exchange='',
+        routing_key=properties.reply_to or default_queue,
+        body=json.dumps({'status': status, key: payload}, default=_json_default),
+        properties=pika.BasicProperties(delivery_mode=2, correlation_id=properties.correlation_id,
+                                        content_type='application/json')
+    )
+
 # Replace the direct connection creation with the retry function
 try:
     connection = create_connection()
@@ -36,16 +52,17 @@ try:
 
     def callback(ch, method, properties, body):
         print(body)
-        # Run analysis
-        report = run_analysis(json.loads(body))
-        
-        # Send response
-        channel.basic_publish(
-            exchange='',
-            routing_key='analyzer_response_queue',
-            body=f"{report}",
-            properties=pika.BasicProperties(delivery_mode=2)
-        )
+        try:
+            # Run analysis
+            report = run_analysis(json.loads(body))
+        except Exception as e:
+            # Always reply, the API holds identical requests on this job until it does
+            print(f" [!] Error in analysis: {e}")
+            send_reply(channel, properties, 'analyzer_response_queue', 'failed', str(e))
+            return
+
+        # Send response, tagged with the request correlation id
+        send_reply(channel, properties, 'analyzer_response_queue', 'completed', report)
 
     # Consume messages
     channel.basic_consume(queue='analyzer_queue', on_message_callback=callback, auto_ack=True)
@@ -69,8 +69,9 @@ class Preprocessor:
 
     def drop_unrelevant(self, df):
         features_to_drop = ['id', 'link', 'operation', 'street', 'neighborhood', 'city',
-                            'page_id', 'scrapping_date']
-        df = df.drop(features_to_drop, axis=1)
+                            'page_id', 'scrapping_date', 'row_version', 'geo_precision']
+        # Projected fetches leave most of these out already
+        df = df.drop(features_to_drop, axis=1, errors='ignore')
         return df
 
     def map_types(self, df):
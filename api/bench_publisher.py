@@ -0,0 +1,84 @@
+""" Publish throughput and p99 latency against a running RabbitMQ, for three ways of publishing:
+    a connection per message as the request functions used to do, the pooled confirm publisher,
+    and the pooled publisher sending batches with one commit each.\n
+    Messages go to a throwaway queue that is deleted afterwards.\n
+    Run with: python bench_publisher.py --host localhost --messages 2000 --threads 8 """
+import argparse
+import threading
+import time
+import uuid
+import pika
+from messages.publisher import Publisher
+
+BODY = '{"operation": "rent", "city": "São Paulo"}'
+
+def connection_per_call(parameters, queue_name):
+    connection = pika.BlockingConnection(parameters)
+    channel = connection.channel()
+    channel.queue_declare(queue=queue_name, durable=True)
+    channel.basic_publish(exchange='', routing_key=queue_name, body=BODY,
+                          properties=pika.BasicProperties(delivery_mode=2))
+    connection.close()
+
+def run_threads(threads, messages, publish_one):
+    """ Publish messages from several threads, return (elapsed, per message latencies) """
+    latencies = []
+    lock = threading.Lock()
+    per_thread = messages // threads
+
+    def worker():
+        mine = []
+        for _ in range(per_thread):
+            start = time.perf_counter()
+            publish_one()
+            mine.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(mine)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return time.perf_counter() - start, latencies
+
+def run_batches(publisher, queue_name, messages, batch_size):
+    """ Publish in batches from one thread, every message waits as long as its batch """
+    latencies = []
+    batch = [(BODY, None)] * batch_size
+    start = time.perf_counter()
+    for _ in range(messages // batch_size):
+        batch_start = time.perf_counter()
+        publisher.publish_many(queue_name, batch, batch_size)
+        latencies.extend([time.perf_counter() - batch_start] * batch_size)
+    return time.perf_counter() - start, latencies
+
+def p99(latencies):
+    ordered = sorted(latencies)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+
+def report(name, elapsed, latencies):
+    print(f'{name:>20}: {len(latencies) / elapsed:8.0f} msgs/s, p99 {p99(latencies) * 1000:7.1f} ms ({len(latencies)} messages)')
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark RabbitMQ publishing strategies')
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--messages', type=int, default=2000)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--batch-size', type=int, default=100)
+    args = parser.parse_args()
+
+    queue_name = f'bench_publisher_{uuid.uuid4().hex[:8]}'
+    publisher = Publisher(host=args.host, pool_size=args.threads)
+    try:
+        report('connection per call', *run_threads(args.threads, args.messages,
+                                                   lambda: connection_per_call(publisher.parameters, queue_name)))
+        report('pooled confirms', *run_threads(args.threads, args.messages,
+                                               lambda: publisher.publish(queue_name, BODY)))
+        report(f'batches of {args.batch_size}', *run_batches(publisher, queue_name, args.messages, args.batch_size))
+    finally:
+        publisher.close()
+        connection = pika.BlockingConnection(publisher.parameters)
+        connection.channel().queue_delete(queue=queue_name)
+        connection.close()
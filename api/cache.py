@@ -0,0 +1,98 @@
+import json
+import threading
+import uuid
+from collections import OrderedDict
+
+class DatasetVersion:
+    """Monotonically increasing version of the properties dataset,
+    bumped every time a load commits changes."""
+    def __init__(self):
+        self._value = 0
+        self._lock = threading.Lock()
+
+        # The counter restarts with the process, the token keeps ETags from colliding across restarts
+        self.token = uuid.uuid4().hex
+
+    @property
+    def value(self):
+        return self._value
+
+    def bump(self):
+        with self._lock:
+            self._value += 1
+            return self._value
+
+class FilterCache:
+    """LRU cache of serialized filter results, bounded by a byte budget.\n
+    Entries are tagged with the dataset version they were computed on,
+    and are dropped once that version is outdated."""
+    def __init__(self, dataset_version: DatasetVersion, max_bytes: int):
+        self.dataset_version = dataset_version
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(filters: dict, **params):
+        """Canonical key for the normalized filters from utils.extract_filters"""
+        return json.dumps({'filters': filters, **params}, sort_keys=True)
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None or entry[0] != self.dataset_version.value:
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: str, version: int, body: bytes, headers: dict = None):
+        """Store a result computed on the given dataset version.\n
+        Ignored if a load committed meanwhile, or if it alone exceeds the budget."""
+        if len(body) > self.max_bytes:
+            return
+
+        with self._lock:
+            if version != self.dataset_version.value:
+                return
+
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = (version, (body, headers or {}))
+            self._size += len(body)
+
+            # Evict least recently used entries until we're back under budget
+            while self._size > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self):
+        return {
+            'version': self.dataset_version.value,
+            'entries': len(self._entries),
+            'bytes': self._size,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions
+        }
+
+    def _remove(self, key: str):
+        _, (body, _) = self._entries.pop(key)
+        self._size -= len(body)
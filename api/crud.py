@@ -1,86 +1,231 @@
+import os
+import json
+from sqlalchemy import or_, not_, func, select, table, column, literal, literal_column, text, tuple_
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import Session
-from models import Properties
+from models import Properties, MANAGED_COLUMNS, OPTIONAL_COLUMNS, version_sequence
 from fastapi import HTTPException
-from utils import export_to_csv
+from utils import iter_csv, iter_arrow, arrow_schema, read_csv_header, property_to_dict
 
-def get_all_properties(db: Session):
+# Records sent per INSERT ... ON CONFLICT statement
+LOAD_BATCH_SIZE = int(os.getenv('LOAD_BATCH_SIZE', 1000))
+
+# Rows fetched per round trip when streaming from a server-side cursor
+STREAM_CHUNK_SIZE = int(os.getenv('STREAM_CHUNK_SIZE', 1000))
+
+# Rows returned per /properties/changes call when the client sets no limit
+CHANGES_PAGE_SIZE = int(os.getenv('CHANGES_PAGE_SIZE', 1000))
+
+# Advisory lock serializing loads, so row versions become visible in the order they were taken
+LOAD_LOCK_KEY = 7301
+
+def get_all_properties(db: Session, after_id: int = None, limit: int = None):
     try:
-        return db.query(Properties).all()
+        query = _paginate(db.query(Properties), after_id, limit)
+        return query.all()
     except Exception as e:
         _error_handler(e)
 
-def get_properties_with_filter(db: Session, filters: dict):
+def get_properties_with_filter(db: Session, filters: dict, after_id: int = None, limit: int = None):
     try:
-        query = db.query(Properties)
-        
-        # Apply exact match filters
-        exact_filters = {k: v for k, v in filters.items() 
-                        if not k.endswith('_gte') and not k.endswith('_lte')}
-        if exact_filters:
-            query = query.filter_by(**exact_filters)
-        
-        # Apply range filters
-        if 'size_gte' in filters:
-            query = query.filter(Properties.size >= filters['size_gte'])
-        if 'size_lte' in filters:
-            query = query.filter(Properties.size <= filters['size_lte'])
-        if 'price_gte' in filters:
-            query = query.filter(Properties.price >= filters['price_gte'])
-        if 'price_lte' in filters:
-            query = query.filter(Properties.price <= filters['price_lte'])
-    
-        return query.all()
+        return db.execute(_filter_statement(filters, after_id, limit)).scalars().all()
     except Exception as e:
         _error_handler(e)
 
+def stream_properties(session_factory, filters: dict, after_id: int = None, limit: int = None):
+    """Yield matching properties as NDJSON lines, fetched through a server-side cursor.\n
+    Opens its own session, since the request one is closed before the body is streamed."""
+    db = session_factory()
+    try:
+        query = _filter_statement(filters, after_id, limit)
+
+        # yield_per on the statement opens a server-side cursor, fetching STREAM_CHUNK_SIZE rows at a time
+        for property in db.execute(query.execution_options(yield_per=STREAM_CHUNK_SIZE)).scalars():
+            yield json.dumps(property_to_dict(property)) + '\n'
+    except Exception as e:
+        # Re-raise so the connection is aborted instead of ending a truncated body as if complete
+        print(f"Error streaming properties: {e}")
+        raise
+    finally:
+        db.close()
+
 def get_properties_count(db: Session):
     try:
         return db.query(Properties).count()
     except Exception as e:
         _error_handler(e)
 
+def get_changes(db: Session, since: int, after_id: int = None, limit: int = None):
+    """Return up to limit rows inserted or updated after the given version, keyset paginated on (row_version, id).\n
+    A full page comes with next_cursor, the since and after_id to ask for the rest of the changes.
+    Once it's None, version is the since to ask from next."""
+    try:
+        limit = limit or CHANGES_PAGE_SIZE
+        version = db.query(func.coalesce(func.max(Properties.row_version), 0)).scalar()
+
+        query = db.query(Properties).filter(Properties.row_version <= version)
+        if after_id is None:
+            query = query.filter(Properties.row_version > since)
+        else:
+            query = query.filter(tuple_(Properties.row_version, Properties.id) > tuple_(since, after_id))
+        changes = query.order_by(Properties.row_version, Properties.id).limit(limit).all()
+
+        # A full page means there may be more changes after the last row
+        next_cursor = None
+        if len(changes) == limit:
+            next_cursor = {'since': changes[-1].row_version, 'after_id': changes[-1].id}
+
+        return {'version': version, 'changes': changes, 'next_cursor': next_cursor}
+    except Exception as e:
+        _error_handler(e)
+
+def get_known_listings(db: Session, operation: str):
+    """Return the page_ids already stored for an operation, sorted, with their prices"""
+    try:
+        rows = db.query(Properties.page_id, Properties.price).filter(
+            Properties.operation == operation
+        ).order_by(Properties.page_id).all()
+
+        return {
+            'operation': operation,
+            'count': len(rows),
+            'page_ids': [row.page_id for row in rows],
+            'prices': [row.price for row in rows]
+        }
+    except Exception as e:
+        _error_handler(e)
+
 def get_property_by_id(db: Session, property_id: int):
     try:
         return db.query(Properties).filter(Properties.id == property_id).first()
     except Exception as e:
         _error_handler(e)
 
-def get_export_to_csv(db: Session):
+def stream_arrow(session_factory, filters: dict, columns: list = None, after_id: int = None, limit: int = None):
+    """Yield the matching properties as an Arrow IPC stream, projected to the given columns"""
+    columns = columns or [column.name for column in Properties.__table__.columns]
+    db = session_factory()
     try:
-        properties = db.query(Properties).all()
-        return export_to_csv(properties)
+        query = select(*[Properties.__table__.c[name] for name in columns])
+        query = _paginate(_apply_filters(query, filters), after_id, limit)
+
+        # yield_per on the statement opens a server-side cursor, fetching STREAM_CHUNK_SIZE rows at a time
+        result = db.execute(query.execution_options(yield_per=STREAM_CHUNK_SIZE))
+        yield from iter_arrow(result.partitions(), arrow_schema(columns))
     except Exception as e:
-        _error_handler(e)
+        # Re-raise so the connection is aborted instead of ending a truncated stream as if complete
+        print(f"Error streaming arrow data: {e}")
+        raise
+    finally:
+        db.close()
+
+def stream_export_csv(session_factory, filters: dict):
+    """Yield the matching properties as CSV chunks, fetched through a server-side cursor"""
+    db = session_factory()
+    try:
+        query = _apply_filters(select(Properties), filters).order_by(Properties.id)
+        result = db.execute(query.execution_options(yield_per=STREAM_CHUNK_SIZE))
+        yield from iter_csv(result.scalars(), STREAM_CHUNK_SIZE)
+    except Exception as e:
+        # Re-raise so the connection is aborted instead of ending a truncated export as if complete
+        print(f"Error exporting properties: {e}")
+        raise
+    finally:
+        db.close()
 
 def get_error():
     error = Exception('Error route is working!')
     _error_handler(error)
 
-def load_data(db: Session, data: list):
+def load_data(db: Session, data: list, batch_size: int = LOAD_BATCH_SIZE):
+    """Upsert records by page_id in batches.\n
+    Only rows whose content changed are rewritten.\n
+    Return inserted, updated and unchanged counts, or None on failure."""
     try:
-        for record in data:
-            # Check if property with this page_id already exists
-            existing_property = db.query(Properties).filter(
-                Properties.page_id == str(record['page_id'])
-            ).first()
-
-            if existing_property:
-                # Update existing property
-                for key, value in record.items():
-                    setattr(existing_property, key, value)
-            else:
-                # Create new property
-                new_property = Properties(**record)
-                db.add(new_property)
+        report = {'inserted': 0, 'updated': 0, 'unchanged': 0}
+        version = _next_version(db)
+
+        for start in range(0, len(data), batch_size):
+            rows = _prepare_rows(data[start:start + batch_size], version)
+            result = db.execute(_upsert_statement(rows))
+
+            # Unchanged rows are filtered by the ON CONFLICT WHERE clause and not returned
+            inserted = [row.inserted for row in result]
+            report['inserted'] += sum(inserted)
+            report['updated'] += len(inserted) - sum(inserted)
+
+        report['unchanged'] = len(data) - report['inserted'] - report['updated']
 
         db.commit()
-        return True
+        return report
     except Exception as e:
         db.rollback()
         print(f"Error loading data: {e}")
-        return False
+        return None
+
+def load_data_stream(db: Session, stream, data_format: str = 'csv'):
+    """Stream a CSV or NDJSON body into a temporary staging table with
+    COPY FROM STDIN, then merge it into properties.\n
+    Return inserted, updated and unchanged counts, or None on failure."""
+    try:
+        cursor = db.connection().connection.cursor()
+        cursor.execute(
+            f"CREATE TEMP TABLE properties_staging ON COMMIT DROP AS "
+            f"SELECT {', '.join(_ingest_columns())} FROM properties WITH NO DATA"
+        )
+
+        if data_format == 'csv':
+            _copy_csv(cursor, stream)
+        elif data_format == 'ndjson':
+            _copy_ndjson(cursor, stream)
+        else:
+            raise ValueError(f"Unsupported format: {data_format}")
+
+        report = _merge_staging(db, _next_version(db))
+
+        db.commit()
+        return report
+    except Exception as e:
+        db.rollback()
+        print(f"Error streaming data: {e}")
+        return None
 
 ## ---------------- Utilities Methods ---------------- ##
+def _filter_statement(filters: dict, after_id: int = None, limit: int = None):
+    """Select of the properties matching filters from utils.extract_filters, as /properties/filter runs it"""
+    return _paginate(_apply_filters(select(Properties), filters), after_id, limit)
+
+def _apply_filters(query, filters: dict):
+    # Apply exact match filters
+    exact_filters = {k: v for k, v in filters.items() 
+                    if not k.endswith('_gte') and not k.endswith('_lte')}
+    if exact_filters:
+        query = query.filter_by(**exact_filters)
+    
+    # Apply range filters
+    if 'size_gte' in filters:
+        query = query.filter(Properties.size >= filters['size_gte'])
+    if 'size_lte' in filters:
+        query = query.filter(Properties.size <= filters['size_lte'])
+    if 'price_gte' in filters:
+        query = query.filter(Properties.price >= filters['price_gte'])
+    if 'price_lte' in filters:
+        query = query.filter(Properties.price <= filters['price_lte'])
+
+    return query
+
+def _paginate(query, after_id: int = None, limit: int = None):
+    """Keyset pagination on id, the primary key index keeps every page cheap"""
+    if after_id is None and limit is None:
+        return query
+
+    query = query.order_by(Properties.id)
+    if after_id is not None:
+        query = query.filter(Properties.id > after_id)
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
 def _error_handler(error: Exception):
     message = 'An error occurred while processing the request'
     error_details = str(error)
@@ -89,3 +234,94 @@ def _error_handler(error: Exception):
         'error': error_details
     })
 
+
+def _ingest_columns():
+    return [column.name for column in Properties.__table__.columns if column.name not in MANAGED_COLUMNS]
+
+def _next_version(db: Session):
+    """Take the version of a load, holding the load lock until the transaction ends.\n
+    Otherwise a later version could commit first, and /properties/changes clients would
+    move their cursor past rows of the earlier one that aren't visible yet."""
+    db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {'key': LOAD_LOCK_KEY})
+    return db.execute(select(version_sequence.next_value())).scalar()
+
+def _prepare_rows(records: list, version: int):
+    """Keep only model columns and the last record of each page_id,
+    since ON CONFLICT can't touch the same row twice in one statement."""
+    columns = _ingest_columns()
+    rows = {}
+    for record in records:
+        row = {column: record.get(column) if column in OPTIONAL_COLUMNS else record[column] for column in columns}
+        row['page_id'] = str(row['page_id'])
+        row['row_version'] = version
+        rows[row['page_id']] = row
+    return list(rows.values())
+
+def _upsert_statement(rows: list):
+    return _on_conflict_update(insert(Properties).values(rows))
+
+def _on_conflict_update(stmt):
+    """Turn an INSERT into an upsert by page_id that only rewrites changed rows."""
+    update_columns = [column for column in _ingest_columns() if column != 'page_id']
+
+    return stmt.on_conflict_do_update(
+        index_elements=['page_id'],
+        set_={column: stmt.excluded[column] for column in update_columns + ['row_version']},
+        where=or_(*[
+            Properties.__table__.c[column].is_distinct_from(stmt.excluded[column])
+            for column in update_columns
+        ])
+    ).returning(literal_column('(xmax = 0)').label('inserted'))
+
+def _copy_csv(cursor, stream):
+    # Scraper files name the page id column 'id'
+    copy_columns = ['page_id' if name == 'id' else name for name in read_csv_header(stream)]
+
+    unknown = set(copy_columns) - set(_ingest_columns())
+    missing = set(_ingest_columns()) - set(copy_columns) - set(OPTIONAL_COLUMNS)
+    if unknown or missing:
+        raise ValueError(f"Invalid CSV header. Unknown: {sorted(unknown)}, missing: {sorted(missing)}")
+
+    cursor.copy_expert(
+        f"COPY properties_staging ({', '.join(copy_columns)}) FROM STDIN WITH (FORMAT csv)",
+        stream
+    )
+
+def _copy_ndjson(cursor, stream):
+    # Load each line as a single jsonb value, using control chars as quote and delimiter
+    cursor.execute("CREATE TEMP TABLE properties_staging_raw (doc jsonb) ON COMMIT DROP")
+    cursor.copy_expert(
+        "COPY properties_staging_raw (doc) FROM STDIN WITH (FORMAT csv, QUOTE e'\\x01', DELIMITER e'\\x02')",
+        stream
+    )
+
+    # Cast documents into typed staging rows, accepting 'id' as page_id
+    cursor.execute(
+        f"INSERT INTO properties_staging "
+        f"SELECT {', '.join(f'r.{column}' for column in _ingest_columns())} "
+        f"FROM properties_staging_raw, "
+        f"jsonb_populate_record(NULL::properties_staging, "
+        f"doc || jsonb_build_object('page_id', COALESCE(doc->'page_id', doc->'id'))) r "
+        f"WHERE doc IS NOT NULL"
+    )
+
+def _merge_staging(db: Session, version: int):
+    """Merge properties_staging into properties in a single upsert statement."""
+    columns = _ingest_columns()
+    staged = table('properties_staging', *[column(name) for name in columns])
+
+    # Keep the last staged row of each page_id
+    source = select(*staged.c, literal(version)).distinct(staged.c.page_id).order_by(
+        staged.c.page_id, literal_column('ctid').desc()
+    )
+    merged = _on_conflict_update(
+        insert(Properties).from_select(columns + ['row_version'], source)
+    ).cte('merged')
+
+    inserted, updated = db.execute(select(
+        func.count().filter(merged.c.inserted),
+        func.count().filter(not_(merged.c.inserted))
+    )).one()
+    staged_count = db.execute(select(func.count()).select_from(staged)).scalar()
+
+    return {'inserted': inserted, 'updated': updated, 'unchanged': staged_count - inserted - updated}
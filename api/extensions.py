@@ -1,9 +1,9 @@
 import os
-from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker
 from fastapi import FastAPI
-from models import Properties 
+from models import Base, Properties
+from cache import DatasetVersion, FilterCache
 
 # Database connection
 DATABASE_URL = f"postgresql://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}@{os.getenv('DB_HOST')}:{os.getenv('DB_PORT')}/{os.getenv('DB_NAME')}"
@@ -14,12 +14,13 @@ engine = create_engine(DATABASE_URL)
 # Create session
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-# Create base
-Base = declarative_base()
-
 # Create app
 app = FastAPI()
 
+# Dataset version and filter results cache
+dataset_version = DatasetVersion()
+filter_cache = FilterCache(dataset_version, int(os.getenv('FILTER_CACHE_BYTES', 64 * 1024 * 1024)))
+
 # Get session
 def get_db():
     db = SessionLocal()
@@ -27,5 +28,44 @@ def get_db():
         yield db
     finally:
         db.close()
-        
-Base.metadata.create_all(bind=engine)
\ No newline at end of file
+
+# Create tables and any index added after the table was first created
+def ensure_schema():
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        connection.execute(text(
+            f"ALTER TABLE {Properties.__tablename__} "
+            f"ADD COLUMN IF NOT EXISTS row_version BIGINT NOT NULL DEFAULT 0"
+        ))
+        connection.execute(text(
+            f"ALTER TABLE {Properties.__tablename__} "
+            f"ADD COLUMN IF NOT EXISTS geo_precision VARCHAR(20)"
+        ))
+
+    _dedupe_page_ids()
+    for index in Properties.__table__.indexes:
+        try:
+            index.create(bind=engine, checkfirst=True)
+        except Exception as e:
+            raise RuntimeError(f"Could not create index {index.name} on {Properties.__tablename__}: {e}") from e
+
+    # Refresh planner statistics so new indexes are picked up right away
+    with engine.begin() as connection:
+        connection.execute(text(f"ANALYZE {Properties.__tablename__}"))
+
+# Tables created before the unique page_id index may hold repeated listings,
+# keep the newest row of each page_id so the index can be built
+def _dedupe_page_ids():
+    with engine.begin() as connection:
+        if connection.execute(text("SELECT to_regclass('ix_properties_page_id')")).scalar() is not None:
+            return
+
+        result = connection.execute(text(
+            f"DELETE FROM {Properties.__tablename__} older "
+            f"USING {Properties.__tablename__} newer "
+            f"WHERE older.page_id = newer.page_id AND older.id < newer.id"
+        ))
+        if result.rowcount:
+            print(f" [*] Removed {result.rowcount} duplicated page_id rows before creating the unique index")
+
+ensure_schema()
@@ -1,10 +1,18 @@
-from fastapi import Depends, Request, Path
+from typing import Optional
+from fastapi import Depends, Request, Response, Path, Query, HTTPException
+from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
+import json
+import hashlib
 import crud
-from extensions import get_db, app
+from models import Properties
+from extensions import get_db, app, SessionLocal, dataset_version, filter_cache
 import messages.requests as req
 from messages.messages import start_listener
-from utils import extract_filters, get_scraping_input, get_data
+from messages.publisher import get_publisher
+from messages.results import result_store
+from utils import extract_filters, get_scraping_input, get_data, gzip_chunks, property_to_dict, RequestStreamReader
 
 ## ---------------- Dependencies Methods ---------------- ##
 async def get_filters(request: Request):
@@ -15,78 +23,245 @@ async def get_input(request: Request):
     input_data = await request.json()
     return input_data
 
+def get_pagination(after_id: Optional[int] = Query(None, description="Return rows with id greater than this cursor"),
+                   limit: Optional[int] = Query(None, gt=0, description="Maximum rows to return"),
+                   data_format: str = Query('json', alias='format', description="json, ndjson or arrow")):
+    return {'after_id': after_id, 'limit': limit, 'format': data_format}
+
+def get_columns(columns: Optional[str] = Query(None, description="Comma separated columns to return, arrow format only")):
+    if not columns:
+        return None
+
+    columns = [name.strip() for name in columns.split(',')]
+    unknown = [name for name in columns if name not in Properties.__table__.c]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown columns: {unknown}")
+    return columns
+
 ## ---------------- Routes ---------------- ##
 # Start RabbitMQ listener when FastAPI starts
 @app.on_event("startup")
 def startup_event():
     start_listener()
 
+# Close pooled publisher connections on shutdown
+@app.on_event("shutdown")
+def shutdown_event():
+    get_publisher().close()
+
 ## ---------------- Requests ---------------- ##
 # Request analysis
 @app.post("/request-analysis")
 def request_analysis(filters: dict = Depends(get_filters)):
     print(f" [*] Requesting analysis for filters: {filters}")
-    request = req.send_analysis_request(filters)
-    return {"message": f"{request}"}
+    message, job_id = req.send_analysis_request(filters)
+    return {"message": message, "job_id": job_id}
 
 # Request price prediction
 @app.post("/request-price-prediction")
 def request_price_prediction(input: dict = Depends(get_input)):
     print(f" [*] Requesting price prediction for input: {input}")
-    request = req.send_price_prediction_request(input)
-    return {"message": f"{request}"}
+    message, job_id = req.send_price_prediction_request(input)
+    return {"message": message, "job_id": job_id}
 
 # Request training
 @app.post("/request-training")
 def request_training(input: dict):
     print(f" [*] Requesting training for input: {input}")
-    request = req.send_training_request(input['operation'])
-    return {"message": f"{request}"}
+    message, job_id = req.send_training_request(input['operation'])
+    return {"message": message, "job_id": job_id}
 
 # Request features columns
 @app.get("/request-features-cols")
 def request_features_cols():
     print(f" [*] Requesting features columns")
-    request = req.send_features_cols_request()
-    return {"message": f"{request}"}
+    message, job_id = req.send_features_cols_request()
+    return {"message": message, "job_id": job_id}
 
 # Request scraping
 @app.post("/request-scraping")
 def request_scraping(input: dict = Depends(get_scraping_input)):
     print(f" [*] Requesting scraping for input: {input}")
-    request = req.send_scraping_request(input)
-    return {"message": f"{request}"}
+    message, job_id = req.send_scraping_request(input)
+    return {"message": message, "job_id": job_id}
+
+## ---------------- Jobs ---------------- ##
+# Get job status
+@app.get("/jobs/{job_id}")
+def job_status(job_id: str):
+    job = result_store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found or expired")
+    job.pop('result')
+    return job
+
+# Get job result, long-polling until it arrives or the wait expires
+@app.get("/jobs/{job_id}/result")
+async def job_result(job_id: str, wait: float = Query(30, ge=0, le=120, description="Seconds to wait for the reply")):
+    job = await result_store.wait(job_id, wait)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found or expired")
+    return job
 
 
 ## ---------------- Properties Routes ---------------- ##
 # Get all properties
 @app.get("/properties")
-def all_properties(db: Session = Depends(get_db)):
-    return crud.get_all_properties(db)
+def all_properties(request: Request, response: Response, db: Session = Depends(get_db),
+                   page: dict = Depends(get_pagination)):
+    etag = _make_etag('all', page)
+    if _is_not_modified(request, etag):
+        return _not_modified_response(etag)
+
+    if page['format'] == 'ndjson':
+        return _with_etag(_stream_response({}, page), etag)
+    properties = crud.get_all_properties(db, page['after_id'], page['limit'])
+    _set_next_cursor(response, properties, page)
+    response.headers['ETag'] = etag
+    return properties
 
 # Get properties with filter
 @app.post("/properties/filter")
-def properties_with_filter(db: Session = Depends(get_db), filters: dict = Depends(get_filters)):
-    return crud.get_properties_with_filter(db, filters)
+def properties_with_filter(request: Request, db: Session = Depends(get_db),
+                           filters: dict = Depends(get_filters), page: dict = Depends(get_pagination),
+                           columns: list = Depends(get_columns)):
+    etag = _make_etag('filter', filters, page, columns)
+    if _is_not_modified(request, etag):
+        return _not_modified_response(etag)
+
+    if page['format'] == 'ndjson':
+        return _with_etag(_stream_response(filters, page), etag)
+    if page['format'] == 'arrow':
+        return _with_etag(_arrow_response(filters, columns, page), etag)
+    return _with_etag(_cached_filter_response(db, filters, page), etag)
 
 # Get properties count
 @app.get("/properties/count")
-def properties_count(db: Session = Depends(get_db)):
+def properties_count(request: Request, response: Response, db: Session = Depends(get_db)):
+    etag = _make_etag('count')
+    if _is_not_modified(request, etag):
+        return _not_modified_response(etag)
+
+    response.headers['ETag'] = etag
     return crud.get_properties_count(db)
 
+# Get rows inserted or updated since a version
+@app.get("/properties/changes")
+def properties_changes(db: Session = Depends(get_db),
+                       since: int = Query(0, ge=0, description="Version returned by the previous call"),
+                       after_id: Optional[int] = Query(None, description="Row id from next_cursor, with its since"),
+                       limit: Optional[int] = Query(None, gt=0, le=10000, description="Maximum rows to return")):
+    return crud.get_changes(db, since, after_id, limit)
+
+# Get page_ids and prices already stored for an operation, used by incremental scraping
+@app.get("/properties/known")
+def properties_known(request: Request, response: Response, db: Session = Depends(get_db),
+                     operation: str = Query(..., description="Operation to list known page_ids for")):
+    etag = _make_etag('known', operation)
+    if _is_not_modified(request, etag):
+        return _not_modified_response(etag)
+
+    response.headers['ETag'] = etag
+    return crud.get_known_listings(db, operation)
+
 # Get properties by id
 @app.get("/properties/{property_id}")
 def property_by_id(db: Session = Depends(get_db), property_id: int = Path(..., description="Property ID")):
     return crud.get_property_by_id(db, property_id)
 
+# Filter cache counters
+@app.get("/cache/stats")
+def cache_stats():
+    return filter_cache.stats()
+
+## ---------------- Cache Helpers ---------------- ##
+def _cached_filter_response(db: Session, filters: dict, page: dict):
+    key = filter_cache.make_key(filters, after_id=page['after_id'], limit=page['limit'])
+    cached = filter_cache.get(key)
+
+    if cached is None:
+        # Capture the version before querying, so a concurrent load can't leave a stale entry
+        version = dataset_version.value
+        properties = crud.get_properties_with_filter(db, filters, page['after_id'], page['limit'])
+
+        body = json.dumps([property_to_dict(property) for property in properties]).encode()
+        next_cursor = _next_cursor(properties, page)
+        headers = {'X-Next-Cursor': next_cursor} if next_cursor else {}
+        filter_cache.put(key, version, body, headers)
+        cached = (body, headers)
+
+    body, headers = cached
+    return Response(content=body, media_type='application/json', headers=headers)
+
+def _bump_dataset_version(result: dict):
+    # Only loads that changed rows make cached results outdated
+    if result and (result['inserted'] or result['updated']):
+        dataset_version.bump()
+        filter_cache.clear()
+
+## ---------------- ETag Helpers ---------------- ##
+def _make_etag(*parts):
+    """Tag a response by dataset version and the normalized request parameters"""
+    payload = json.dumps([dataset_version.token, dataset_version.value, *parts], sort_keys=True)
+    return f'"{hashlib.sha1(payload.encode()).hexdigest()}"'
+
+def _is_not_modified(request: Request, etag: str):
+    if_none_match = request.headers.get('if-none-match')
+    if not if_none_match:
+        return False
+    return if_none_match.strip() == '*' or etag in [tag.strip() for tag in if_none_match.split(',')]
+
+def _not_modified_response(etag: str):
+    return Response(status_code=304, headers={'ETag': etag})
+
+def _with_etag(response: Response, etag: str):
+    response.headers['ETag'] = etag
+    return response
+
+## ---------------- Pagination Helpers ---------------- ##
+def _stream_response(filters: dict, page: dict):
+    rows = crud.stream_properties(SessionLocal, filters, page['after_id'], page['limit'])
+    return StreamingResponse(rows, media_type='application/x-ndjson')
+
+def _arrow_response(filters: dict, columns: list, page: dict):
+    batches = crud.stream_arrow(SessionLocal, filters, columns, page['after_id'], page['limit'])
+    return StreamingResponse(batches, media_type='application/vnd.apache.arrow.stream')
+
+def _next_cursor(properties: list, page: dict):
+    # A full page means there may be more rows after the last id
+    if page['limit'] and properties and len(properties) == page['limit']:
+        return str(properties[-1].id)
+    return None
+
+def _set_next_cursor(response: Response, properties: list, page: dict):
+    next_cursor = _next_cursor(properties, page)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+
 ## ---------------- Data Routes ---------------- ##
+# Export properties as CSV, accepts the same filters as /properties/filter as query params
 @app.get("/export-properties")
-def export_properties(db: Session = Depends(get_db)):
-    return crud.get_export_to_csv(db)
+def export_properties(request: Request, compress: bool = Query(False, alias='gzip')):
+    filters = extract_filters(dict(request.query_params))
+    chunks = crud.stream_export_csv(SessionLocal, filters)
+
+    if compress:
+        return StreamingResponse(gzip_chunks(chunks), media_type='application/gzip',
+                                 headers={'Content-Disposition': 'attachment; filename="properties.csv.gz"'})
+    return StreamingResponse(chunks, media_type='text/csv',
+                             headers={'Content-Disposition': 'attachment; filename="properties.csv"'})
 
 @app.post("/load-data")
 def load_data(db: Session = Depends(get_db), data: list = Depends(get_data)):
     print(f" [*] Loading data: {len(data)} records")
     result = crud.load_data(db, data)
-    return {"success": result, "message": f"Loaded {len(data)} records"}
+    _bump_dataset_version(result)
+    return {"success": result is not None, "message": f"Loaded {len(data)} records", **(result or {})}
 
+@app.post("/load-data/stream")
+async def load_data_stream(request: Request, db: Session = Depends(get_db),
+                           data_format: str = Query('csv', alias='format', description="csv or ndjson")):
+    print(f" [*] Streaming {data_format} data")
+    result = await run_in_threadpool(crud.load_data_stream, db, RequestStreamReader(request), data_format)
+    _bump_dataset_version(result)
+    return {"success": result is not None, **(result or {})}
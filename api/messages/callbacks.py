@@ -1,14 +1,26 @@
+from .results import result_store
+
+def _store_reply(properties, body):
+    # Replies without a correlation id come from requests sent before job tracking
+    if properties.correlation_id:
+        result_store.complete(properties.correlation_id, body)
+
 def analyzer_callback(ch, method, properties, body):
     print(f" [x] Received Analyzer response: {body}")
+    _store_reply(properties, body)
 
 def price_prediction_callback(ch, method, properties, body):
     print(f" [x] Received Price Prediction response: {body}")
+    _store_reply(properties, body)
 
 def training_callback(ch, method, properties, body):
     print(f" [x] Received Training response: {body}")
+    _store_reply(properties, body)
     
 def features_cols_callback(ch, method, properties, body):
     print(f" [x] Received Features Columns response: {body}")
+    _store_reply(properties, body)
 
 def scraper_callback(ch, method, properties, body):
     print(f" [x] Received Scraping response: {body}")
+    _store_reply(properties, body)
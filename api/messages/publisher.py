@@ -0,0 +1,134 @@
+import pika
+import queue
+import threading
+from pika.exceptions import AMQPError
+
+class _PooledChannel:
+    def __init__(self, parameters):
+        self.connection = pika.BlockingConnection(parameters)
+        self.channel = self.connection.channel()
+        self.channel.confirm_delivery()
+        self._batch_channel = None
+        self.declared_queues = set()
+
+    @property
+    def batch_channel(self):
+        """Transactional channel on the same connection, one commit confirms a whole batch"""
+        if self._batch_channel is None or not self._batch_channel.is_open:
+            self._batch_channel = self.connection.channel()
+            self._batch_channel.tx_select()
+        return self._batch_channel
+
+    @property
+    def is_open(self):
+        return self.connection.is_open and self.channel.is_open
+
+    def close(self):
+        try:
+            if self.connection.is_open:
+                self.connection.close()
+        except AMQPError:
+            pass
+
+class Publisher:
+    """Long lived, thread-safe RabbitMQ publisher.\n
+    Keeps a pool of confirm-mode channels, each on its own connection since pika
+    connections can't be shared across threads. Channels are opened lazily,
+    queues declared once per channel and broken channels reopened on retry.
+    publish_many sends bursts through a transactional channel, one commit per batch."""
+    def __init__(self, host='rabbitmq', pool_size=4, retries=3):
+        self.parameters = pika.ConnectionParameters(
+            host=host,
+            heartbeat=600,
+            blocked_connection_timeout=300,
+            port=5672,
+            credentials=pika.PlainCredentials('guest', 'guest')
+        )
+        self.retries = retries
+        self._pool = queue.LifoQueue()
+        for _ in range(pool_size):
+            self._pool.put(None)
+
+    def publish(self, queue_name: str, body: str, properties: pika.BasicProperties = None):
+        """Publish a persistent message and wait for the broker confirm.\n
+        Raise the last error if every retry failed."""
+        properties = properties or pika.BasicProperties(delivery_mode=2)
+
+        def send(pooled):
+            pooled.channel.basic_publish(
+                exchange='',
+                routing_key=queue_name,
+                body=body,
+                properties=properties,
+                mandatory=True
+            )
+
+        self._run(queue_name, send)
+
+    def publish_many(self, queue_name: str, messages: list, batch_size: int = 100):
+        """Publish (body, properties) pairs, waiting for the broker once per batch instead of per message.\n
+        A failed batch is retried whole, so its messages may be delivered twice.
+        Raise the last error if every retry of a batch failed."""
+        for start in range(0, len(messages), batch_size):
+            batch = messages[start:start + batch_size]
+
+            def send(pooled):
+                channel = pooled.batch_channel
+                for body, properties in batch:
+                    channel.basic_publish(
+                        exchange='',
+                        routing_key=queue_name,
+                        body=body,
+                        properties=properties or pika.BasicProperties(delivery_mode=2)
+                    )
+                channel.tx_commit()
+
+            self._run(queue_name, send)
+
+    def _run(self, queue_name: str, send):
+        """Call send with a pooled channel ready to publish to queue_name, retrying on broken connections"""
+        error = None
+
+        for _ in range(self.retries):
+            # Blocks while every channel is busy, bounding concurrent publishes
+            pooled = self._pool.get()
+            try:
+                if pooled is None or not pooled.is_open:
+                    pooled = _PooledChannel(self.parameters)
+
+                # Service heartbeats on connections that sat idle in the pool
+                pooled.connection.process_data_events(0)
+
+                if queue_name not in pooled.declared_queues:
+                    pooled.channel.queue_declare(queue=queue_name, durable=True)
+                    pooled.declared_queues.add(queue_name)
+
+                send(pooled)
+                return
+            except (AMQPError, OSError) as e:
+                print(f" [!] Publish to {queue_name} failed, reconnecting: {e}")
+                error = e
+                if pooled is not None:
+                    pooled.close()
+                pooled = None
+            finally:
+                self._pool.put(pooled)
+
+        raise error
+
+    def close(self):
+        while not self._pool.empty():
+            pooled = self._pool.get_nowait()
+            if pooled is not None:
+                pooled.close()
+
+_publisher = None
+_publisher_lock = threading.Lock()
+
+def get_publisher():
+    """Shared publisher, created on first use"""
+    global _publisher
+    with _publisher_lock:
+        if _publisher is None:
+            _publisher = Publisher()
+        return _publisher
@@ -1,93 +1,71 @@
-import pika
 import json
+import pika
+from .publisher import get_publisher
+from .results import result_store
 
 def send_analysis_request(filters: dict):
     """Send a message to the RabbitMQ queue for analysis"""
     try:
-        connection = pika.BlockingConnection(pika.ConnectionParameters('rabbitmq'))
-        channel = connection.channel()
-        channel.queue_declare(queue='analyzer_queue', durable=True)
-
-        channel.basic_publish(
-            exchange='',
-            routing_key='analyzer_queue',
-            body=json.dumps(filters),
-            properties=pika.BasicProperties(delivery_mode=2)
-            )
-        connection.close()
-        return f" [x] Sent Analyzer request for filters:'{filters}'"
+        job_id, created = _dispatch('analysis', 'analyzer_queue', 'analyzer_response_queue', json.dumps(filters),
+                                    dedup_key=f"analysis:{json.dumps(filters, sort_keys=True)}")
+        if not created:
+            return f" [x] Analyzer request for filters:'{filters}' already in progress", job_id
+        return f" [x] Sent Analyzer request for filters:'{filters}'", job_id
     except Exception as e:
-        return f" [!] Error sending analysis request: {e}"
+        return f" [!] Error sending analysis request: {e}", None
 
 def send_price_prediction_request(input: dict):
     """Send a message to the RabbitMQ queue for price prediction"""
     try:
-        connection = pika.BlockingConnection(pika.ConnectionParameters('rabbitmq'))
-        channel = connection.channel()
-        channel.queue_declare(queue='price_prediction_queue', durable=True)
-
-        channel.basic_publish(
-            exchange='',
-            routing_key='price_prediction_queue',
-            body=json.dumps(input),
-            properties=pika.BasicProperties(delivery_mode=2)
-        )
-        connection.close()
-        return f" [x] Sent Price Prediction request for input:'{input}'"
+        job_id, _ = _dispatch('price_prediction', 'price_prediction_queue', 'price_prediction_response_queue', json.dumps(input))
+        return f" [x] Sent Price Prediction request for input:'{input}'", job_id
     except Exception as e:
-        return f" [!] Error sending price prediction request: {e}"
+        return f" [!] Error sending price prediction request: {e}", None
 
 def send_training_request(operation: str):
     """Send a message to the RabbitMQ queue for training"""
     try:
-        connection = pika.BlockingConnection(pika.ConnectionParameters('rabbitmq'))
-        channel = connection.channel()
-        channel.queue_declare(queue='training_queue', durable=True)
-
-        channel.basic_publish(
-            exchange='',
-            routing_key='training_queue',   
-            body=json.dumps({"operation": operation}),
-            properties=pika.BasicProperties(delivery_mode=2)    
-        )
-        connection.close()
-        return f" [x] Sent Training request"
+        job_id, created = _dispatch('training', 'training_queue', 'training_response_queue', json.dumps({"operation": operation}),
+                                    dedup_key=f"training:{operation}")
+        if not created:
+            return f" [x] Training request for '{operation}' already in progress", job_id
+        return f" [x] Sent Training request", job_id
     except Exception as e:
-        return f" [!] Error sending training request: {e}"
+        return f" [!] Error sending training request: {e}", None
 
-def send_features_cols_request(): 
+def send_features_cols_request():
     """Send a message to the RabbitMQ queue for features columns"""
     try:
-        connection = pika.BlockingConnection(pika.ConnectionParameters('rabbitmq'))
-        channel = connection.channel()
-        channel.queue_declare(queue='features_cols_queue', durable=True)
-
-        channel.basic_publish(
-            exchange='',
-            routing_key='features_cols_queue',
-            body=json.dumps({}),
-            properties=pika.BasicProperties(delivery_mode=2)
-        )
-        connection.close()
-        return f" [x] Sent Features Columns request"
+        job_id, _ = _dispatch('features_cols', 'features_cols_queue', 'features_cols_response_queue', json.dumps({}))
+        return f" [x] Sent Features Columns request", job_id
     except Exception as e:
-        return f" [!] Error sending features columns request: {e}"
-    
-def send_scraping_request(input: dict): 
+        return f" [!] Error sending features columns request: {e}", None
+
+def send_scraping_request(input: dict):
     """Send a message to the RabbitMQ queue for scraping"""
     try:
-        connection = pika.BlockingConnection(pika.ConnectionParameters('rabbitmq'))
-        channel = connection.channel()
-        channel.queue_declare(queue='scraper_queue', durable=True)
-
-        channel.basic_publish(
-            exchange='',
-            routing_key='scraper_queue',
-            body=json.dumps(input),
-            properties=pika.BasicProperties(delivery_mode=2)
-        )
-        connection.close()
-        return f" [x] Sent Scraping request for input:'{input}'"
+        job_id, _ = _dispatch('scraping', 'scraper_queue', 'scraper_response_queue', json.dumps(input))
+        return f" [x] Sent Scraping request for input:'{input}'", job_id
     except Exception as e:
-        return f" [!] Error sending scraping request: {e}"
+        return f" [!] Error sending scraping request: {e}", None
+
+def _dispatch(kind: str, queue_name: str, reply_queue: str, body: str, dedup_key: str = None):
+    """Register a job and publish its message, tagged with the job id as correlation id.\n
+    Requests sharing a dedup_key with a pending job attach to it instead of being published.
+    Return (job_id, created), the reply is stored by the listener under the job id."""
+    job_id, created = result_store.create(kind, dedup_key)
+    if not created:
+        return job_id, False
 
+    properties = pika.BasicProperties(
+        delivery_mode=2,
+        correlation_id=job_id,
+        reply_to=reply_queue
+    )
+
+    try:
+        get_publisher().publish(queue_name, body, properties)
+    except Exception as e:
+        result_store.fail(job_id, str(e))
+        raise
+    return job_id, True
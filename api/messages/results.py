@@ -0,0 +1,144 @@
+import asyncio
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+class ResultStore:
+    """Bounded in-memory store of dispatched jobs and their replies, keyed by job id.\n
+    Finished jobs expire ttl seconds after their reply, the oldest are dropped beyond max_jobs.
+    A pending job takes identical requests until its reply arrives. Workers reply on failure too,
+    pending_ttl only bounds jobs whose worker died, so it should exceed the longest job.
+    Waiters are woken up as soon as a reply arrives."""
+    def __init__(self, max_jobs=1000, ttl=3600, pending_ttl=None):
+        self.max_jobs = max_jobs
+        self.ttl = ttl
+        self.pending_ttl = pending_ttl if pending_ttl is not None else int(os.getenv('JOB_PENDING_TTL', 6 * 3600))
+        self._jobs = OrderedDict()
+        self._pending_keys = {}
+        self._waiters = {}
+        self._lock = threading.Lock()
+
+    def create(self, kind: str, dedup_key: str = None):
+        """Register a new job, or return the pending job already registered under dedup_key.\n
+        Return (job_id, created)."""
+        with self._lock:
+            self._evict()
+
+            if dedup_key is not None and dedup_key in self._pending_keys:
+                return self._pending_keys[dedup_key], False
+
+            job_id = uuid.uuid4().hex
+            self._jobs[job_id] = {
+                'job_id': job_id,
+                'kind': kind,
+                'status': 'pending',
+                'result': None,
+                'created_at': time.time(),
+                'completed_at': None,
+                'dedup_key': dedup_key
+            }
+            if dedup_key is not None:
+                self._pending_keys[dedup_key] = job_id
+            self._evict()
+        return job_id, True
+
+    def complete(self, job_id: str, body: bytes):
+        """Store a worker reply, JSON shaped {"status": "completed", "result": ...} or
+        {"status": "failed", "error": ...}. Replies in any other shape are stored as results."""
+        reply = _decode(body)
+        if isinstance(reply, dict) and reply.get('status') == 'failed':
+            self._finish(job_id, 'failed', reply.get('error'))
+        elif isinstance(reply, dict) and reply.get('status') == 'completed':
+            self._finish(job_id, 'completed', reply.get('result'))
+        else:
+            self._finish(job_id, 'completed', reply)
+
+    def fail(self, job_id: str, error: str):
+        self._finish(job_id, 'failed', error)
+
+    def get(self, job_id: str):
+        with self._lock:
+            self._evict()
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    async def wait(self, job_id: str, timeout: float):
+        """Wait until the job is no longer pending or the timeout passes, return its state.\n
+        Awaits an event set from the consumer thread, so waiting holds no worker thread."""
+        event = asyncio.Event()
+        waiter = (asyncio.get_running_loop(), event)
+
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job['status'] != 'pending':
+                return dict(job) if job else None
+            self._waiters.setdefault(job_id, []).append(waiter)
+
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._lock:
+                waiters = self._waiters.get(job_id, [])
+                if waiter in waiters:
+                    waiters.remove(waiter)
+                if not waiters:
+                    self._waiters.pop(job_id, None)
+
+        return self.get(job_id)
+
+    def _finish(self, job_id: str, status: str, result):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                print(f" [!] Reply for unknown or expired job: {job_id}")
+                return
+            job['status'] = status
+            job['result'] = result
+            job['completed_at'] = time.time()
+            self._release_key(job)
+            self._notify(job_id)
+
+    def _notify(self, job_id: str):
+        # Replies arrive on the consumer thread, wake each waiter on its own event loop
+        for loop, event in self._waiters.get(job_id, []):
+            loop.call_soon_threadsafe(event.set)
+
+    def _evict(self):
+        now = time.time()
+        for job in list(self._jobs.values()):
+            if job['status'] == 'pending':
+                # The worker died without replying, fail the job so identical requests start over
+                if job['created_at'] < now - self.pending_ttl:
+                    job['status'] = 'failed'
+                    job['result'] = f"No reply within {self.pending_ttl}s"
+                    job['completed_at'] = now
+                    self._release_key(job)
+                    self._notify(job['job_id'])
+            elif job['completed_at'] < now - self.ttl:
+                del self._jobs[job['job_id']]
+
+        # Jobs are kept in creation order, the oldest go first
+        while len(self._jobs) > self.max_jobs:
+            _, oldest = self._jobs.popitem(last=False)
+            self._release_key(oldest)
+            self._notify(oldest['job_id'])
+
+    def _release_key(self, job: dict):
+        # New requests with the same key start a fresh job from now on
+        if self._pending_keys.get(job['dedup_key']) == job['job_id']:
+            del self._pending_keys[job['dedup_key']]
+
+def _decode(body: bytes):
+    """Replies are JSON, plain text is kept for workers that haven't been redeployed yet"""
+    text = body.decode() if isinstance(body, bytes) else body
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+result_store = ResultStore()
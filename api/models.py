@@ -1,10 +1,32 @@
-from sqlalchemy import Column, Integer, String, Float
+from sqlalchemy import Column, Integer, BigInteger, String, Float, Index, Sequence
 from sqlalchemy.ext.declarative import declarative_base
 
 Base = declarative_base()
 
+# One value per committed load, stamped on every row it inserts or updates
+version_sequence = Sequence('properties_version_seq', metadata=Base.metadata)
+
+# Columns filled by the database rather than by ingested records
+MANAGED_COLUMNS = ('id', 'row_version')
+
+# Ingested when present in a record, NULL otherwise
+OPTIONAL_COLUMNS = ('geo_precision',)
+
 class Properties(Base):
     __tablename__ = 'properties'
+    __table_args__ = (
+        # Required by the ON CONFLICT (page_id) upsert in crud.load_data
+        Index('ix_properties_page_id', 'page_id', unique=True),
+
+        # Filter shapes from utils.extract_filters, operation and city always lead
+        Index('ix_properties_location', 'operation', 'city', 'neighborhood', 'type'),
+        Index('ix_properties_rooms', 'operation', 'city', 'dorms', 'toilets', 'garage'),
+        Index('ix_properties_price', 'operation', 'city', 'price'),
+        Index('ix_properties_size', 'operation', 'city', 'size'),
+
+        # Change feed lookups
+        Index('ix_properties_row_version', 'row_version'),
+    )
 
     id = Column(Integer, primary_key=True)
     page_id = Column(String(50), nullable=False)
@@ -23,5 +45,6 @@ class Properties(Base):
     city = Column(String(255), nullable=False)
     latitude = Column(Float, nullable=False)
     longitude = Column(Float, nullable=False)
-
-
+    # How the coordinates were found: address, street or neighborhood centroid
+    geo_precision = Column(String(20), nullable=True)
+    row_version = Column(BigInteger, nullable=False, server_default='0')
@@ -0,0 +1,5 @@
+import sys
+import os
+
+# Tests import the api modules the same way the app does, from the api folder
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -1,6 +1,10 @@
-from models import Properties
-from io import StringIO
+from models import Properties, MANAGED_COLUMNS, OPTIONAL_COLUMNS
+from io import StringIO, BytesIO
 import csv
+import zlib
+import anyio
+import pyarrow as pa
+from sqlalchemy import Integer, Float
 from fastapi import Request
 
 def extract_filters(requested_filters: dict):
@@ -58,34 +62,67 @@ def extract_filters(requested_filters: dict):
 
     return filters
 
-def export_to_csv(properties: list):
-     # Get all column names from the Properties model
+def property_to_dict(property: Properties):
+    return {column.name: getattr(property, column.name) for column in Properties.__table__.columns}
+
+def iter_csv(properties, chunk_size: int = 1000):
+    """Yield CSV text for the given properties, a header then one chunk per chunk_size rows"""
+    # Get all column names from the Properties model
     columns = [column.name for column in Properties.__table__.columns]
-    
-    # Create CSV content
-    csv_content = []
-    csv_content.append(columns)  # Add header row
-    
-    # Add data rows
-    for property in properties:
-        row = [getattr(property, column) for column in columns]
-        csv_content.append(row)
-    
+
     output = StringIO()
     writer = csv.writer(output)
-    
-    # Write all rows to the CSV
-    writer.writerows(csv_content)
-    
-    # Get the CSV string
-    csv_string = output.getvalue()
-    
-    # Save locally
-    with open('properties.csv', 'w') as file:
-        file.write(csv_string)
-    
-    # Return length of the csv file
-    return len(csv_string)
+    writer.writerow(columns)
+
+    for count, property in enumerate(properties, start=1):
+        writer.writerow([getattr(property, column) for column in columns])
+
+        # Flush the buffer every chunk so memory stays bounded
+        if count % chunk_size == 0:
+            yield output.getvalue()
+            output.seek(0)
+            output.truncate()
+
+    yield output.getvalue()
+
+def arrow_schema(columns: list):
+    """Arrow schema for the given Properties columns"""
+    def arrow_type(column_type):
+        if isinstance(column_type, Integer):
+            return pa.int64()
+        if isinstance(column_type, Float):
+            return pa.float64()
+        return pa.string()
+
+    return pa.schema([(name, arrow_type(Properties.__table__.c[name].type)) for name in columns])
+
+def iter_arrow(partitions, schema: pa.Schema):
+    """Yield an Arrow IPC stream, one record batch per partition of row tuples"""
+    sink = BytesIO()
+
+    def drain():
+        data = sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+        return data
+
+    with pa.ipc.new_stream(sink, schema) as writer:
+        for rows in partitions:
+            arrays = [pa.array(values, type=field.type) for values, field in zip(zip(*rows), schema)]
+            writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+            yield drain()
+
+    # End of stream marker
+    yield drain()
+
+def gzip_chunks(chunks):
+    """Compress a stream of text chunks into a gzip byte stream"""
+    compressor = zlib.compressobj(wbits=31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk.encode())
+        if compressed:
+            yield compressed
+    yield compressor.flush()
     
 def get_scraping_input(input: dict):
     """Get the scraping input from the filters"""
@@ -102,6 +139,12 @@ def get_scraping_input(input: dict):
         'tasks': input['tasks']
     }
 
+    # Optional number of browsers to split the pages across, page fetching mode, parsing threads
+    # and incremental mode with the fraction of known cards that stops pagination
+    for option in ('workers', 'fetch_mode', 'parse_workers', 'incremental', 'stop_fraction'):
+        if option in input:
+            task[option] = input[option]
+
     return task
 
 async def get_data(request: Request):
@@ -112,7 +155,8 @@ async def get_data(request: Request):
         raise ValueError("Data must be a list of records")
     
     # Validate that each record has the required fields based on Properties model
-    required_fields = [column.name for column in Properties.__table__.columns if column.name != 'id']
+    required_fields = [column.name for column in Properties.__table__.columns
+                       if column.name not in MANAGED_COLUMNS and column.name not in OPTIONAL_COLUMNS]
     
     for record in data:
         missing_fields = [field for field in required_fields if field not in record]
@@ -120,3 +164,44 @@ async def get_data(request: Request):
             raise ValueError(f"Missing required fields: {missing_fields}")
     
     return data
+
+class RequestStreamReader:
+    """File-like view of a request body, read from a worker thread.\n
+    Lets COPY FROM STDIN consume the body chunk by chunk without loading it in memory."""
+    def __init__(self, request: Request):
+        self._chunks = request.stream()
+        self._buffer = b''
+        self._eof = False
+
+    async def _next_chunk(self):
+        return await self._chunks.__anext__()
+
+    def _fill(self):
+        try:
+            self._buffer += anyio.from_thread.run(self._next_chunk)
+        except StopAsyncIteration:
+            self._eof = True
+
+    def read(self, size=-1):
+        while not self._eof and (size < 0 or len(self._buffer) < size):
+            self._fill()
+
+        if size < 0:
+            size = len(self._buffer)
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def readline(self):
+        while not self._eof and b'\n' not in self._buffer:
+            self._fill()
+
+        end = self._buffer.find(b'\n') + 1 or len(self._buffer)
+        line, self._buffer = self._buffer[:end], self._buffer[end:]
+        return line
+
+def read_csv_header(stream):
+    """Consume the header line of a CSV stream and return its column names"""
+    line = stream.readline().decode('utf-8-sig')
+    if not line.strip():
+        raise ValueError("CSV body is empty")
+    return next(csv.reader([line]))
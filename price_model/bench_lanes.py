@@ -0,0 +1,82 @@
+""" Prediction latency while a training run is in progress, measured against the running stack.\n
+    Times price predictions through the API while idle, then again while a training job is pending,
+    and exits with an error when the p95 during training exceeds --max-ratio times the idle p95.\n
+    Run with: python bench_lanes.py --api http://localhost:8000 --operation rent """
+import argparse
+import json
+import sys
+import time
+import requests
+
+# Any valid model input works, the latency of the lane is what's measured
+SAMPLE_INPUT = {
+    'location': [-23.5613, -46.6565],
+    'size': 70,
+    'dorms': 2,
+    'toilets': 2,
+    'garage': 1,
+    'type': [1, 0, 0, 0]
+}
+
+def predict(api, input_data, timeout):
+    """ Return the round trip in seconds of one prediction, from request to reply """
+    start = time.perf_counter()
+    response = requests.post(f'{api}/request-price-prediction', json=input_data, timeout=10)
+    response.raise_for_status()
+    job_id = response.json()['job_id']
+
+    response = requests.get(f'{api}/jobs/{job_id}/result', params={'wait': timeout}, timeout=timeout + 10)
+    response.raise_for_status()
+    if response.json()['status'] == 'pending':
+        raise RuntimeError(f'No prediction reply within {timeout}s')
+    return time.perf_counter() - start
+
+def is_pending(api, job_id):
+    response = requests.get(f'{api}/jobs/{job_id}', timeout=10)
+    response.raise_for_status()
+    return response.json()['status'] == 'pending'
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+def summary(samples):
+    return (f'{len(samples)} predictions, p50 {percentile(samples, 0.5) * 1000:.0f} ms, '
+            f'p95 {percentile(samples, 0.95) * 1000:.0f} ms, max {max(samples) * 1000:.0f} ms')
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Check prediction latency stays bounded while training runs')
+    parser.add_argument('--api', default='http://localhost:8000')
+    parser.add_argument('--operation', default='rent')
+    parser.add_argument('--input', type=json.loads, default=SAMPLE_INPUT, help='Prediction input as JSON')
+    parser.add_argument('--samples', type=int, default=20, help='Idle predictions for the baseline')
+    parser.add_argument('--interval', type=float, default=0.5, help='Seconds between predictions')
+    parser.add_argument('--duration', type=float, default=300, help='Longest time to sample during training')
+    parser.add_argument('--timeout', type=float, default=30, help='Seconds to wait for each reply')
+    parser.add_argument('--max-ratio', type=float, default=3, help='Allowed p95 during training over idle p95')
+    args = parser.parse_args()
+
+    idle = []
+    for _ in range(args.samples):
+        idle.append(predict(args.api, args.input, args.timeout))
+        time.sleep(args.interval)
+    print(f'Idle:            {summary(idle)}')
+
+    response = requests.post(f'{args.api}/request-training', json={'operation': args.operation}, timeout=10)
+    response.raise_for_status()
+    training_job = response.json()['job_id']
+
+    training = []
+    deadline = time.monotonic() + args.duration
+    while time.monotonic() < deadline and is_pending(args.api, training_job):
+        training.append(predict(args.api, args.input, args.timeout))
+        time.sleep(args.interval)
+
+    if not training:
+        sys.exit('Training finished before any prediction was timed, try a larger dataset')
+    print(f'During training: {summary(training)}')
+
+    ratio = percentile(training, 0.95) / percentile(idle, 0.95)
+    print(f'p95 ratio: {ratio:.2f} (max {args.max_ratio})')
+    if ratio > args.max_ratio:
+        sys.exit(1)
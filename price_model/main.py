@@ -1,9 +1,14 @@
 import pika
 import time
 import json
+import os
+import multiprocessing
 from pika.exceptions import AMQPConnectionError
 from utils import run_training, make_prediction
 
+# Training runs niced so the OS schedules prediction work first
+TRAINING_NICENESS = int(os.getenv('TRAINING_NICENESS', 10))
+
 def create_connection():
     retries = 20
     while retries > 0:
@@ -25,57 +30,107 @@ def create_connection():
                 raise e
             time.sleep(5)  # Wait 5 seconds before retrying
 
-try:
-    connection = create_connection()
-    channel = connection.channel()
-
-    # Declare a queues
-    channel.queue_declare(queue='price_prediction_queue', durable=True)
-    channel.queue_declare(queue='price_prediction_response_queue', durable=True)
-    channel.queue_declare(queue='training_queue', durable=True)
-    channel.queue_declare(queue='training_response_queue', durable=True)
-
-    def training_callback(ch, method, properties, body):
-        print(f" [*] Training Task received")
-        # Run training
-        result = run_training(json.loads(body))
-        
-        if result:
-            response = "Training completed"
-        else:
-            response = "Training failed"
-            
-        # Send response
-        channel.basic_publish(
-            exchange='',
-            routing_key='training_response_queue',
-            body=response,
-            properties=pika.BasicProperties(delivery_mode=2)
-        )
-
-    def price_prediction_callback(ch, method, properties, body):
-        print(f" [*] Price Prediction Task received")
-        print(f"[*] Input data: {body}")
-
-        # Make prediction
-        prediction = make_prediction(json.loads(body))
-
-        # Send response
-        channel.basic_publish(
-            exchange='',
-            routing_key='price_prediction_response_queue',
-            body=f"Price prediction completed: {prediction}",
-            properties=pika.BasicProperties(delivery_mode=2)
-        )
-    
-        
-    # Consume messages
-    channel.basic_consume(queue='price_prediction_queue', on_message_callback=price_prediction_callback, auto_ack=True)
-    channel.basic_consume(queue='training_queue', on_message_callback=training_callback, auto_ack=True)
-
-    print('Waiting for messages...')
-    channel.start_consuming()
-except AMQPConnectionError:
-    print("Could not establish connection to RabbitMQ after multiple retries")
-    raise
+def _json_default(value):
+    # numpy and pandas scalars
+    return value.item() if hasattr(value, 'item') else str(value)
+
+def send_reply(channel, properties, default_queue, status, payload):
+    """Publish a JSON reply, {"status": "completed", "result": ...} or {"status": "failed", "error": ...},
+    tagged with the request correlation id"""
+    key = 'result' if status == 'completed' else 'error'
+    channel.basic_publish(
+        exchange='',
+        routing_key=properties.reply_to or default_queue,
+        body=json.dumps({'status': status, key: payload}, default=_json_default),
+        properties=pika.BasicProperties(delivery_mode=2, correlation_id=properties.correlation_id,
+                                        content_type='application/json')
+    )
+
+## ---- Lanes ---- ##
+# Interactive predictions and batch training consume on separate connections and processes,
+# so a training run never holds up the prediction callbacks.
+def prediction_lane():
+    """Interactive lane: answers price prediction requests"""
+    try:
+        connection = create_connection()
+        channel = connection.channel()
+
+        # Declare a queues
+        channel.queue_declare(queue='price_prediction_queue', durable=True)
+        channel.queue_declare(queue='price_prediction_response_queue', durable=True)
+
+        def price_prediction_callback(ch, method, properties, body):
+            print(f" [*] Price Prediction Task received")
+            print(f"[*] Input data: {body}")
+
+            # Make prediction, always replying since the API waits on this job until it does
+            try:
+                prediction = make_prediction(json.loads(body))
+            except Exception as e:
+                prediction = e
+
+            # Send response, tagged with the request correlation id, errors come back as values
+            if isinstance(prediction, dict):
+                send_reply(channel, properties, 'price_prediction_response_queue', 'completed', prediction)
+            else:
+                send_reply(channel, properties, 'price_prediction_response_queue', 'failed', str(prediction))
+
+        # Consume messages
+        channel.basic_consume(queue='price_prediction_queue', on_message_callback=price_prediction_callback, auto_ack=True)
+
+        print('Prediction lane waiting for messages...')
+        channel.start_consuming()
+    except AMQPConnectionError:
+        print("Could not establish connection to RabbitMQ after multiple retries")
+        raise
+
+def training_lane():
+    """Batch lane: runs model training at a lower CPU priority"""
+    os.nice(TRAINING_NICENESS)
+    try:
+        connection = create_connection()
+        channel = connection.channel()
+
+        # Declare a queues
+        channel.queue_declare(queue='training_queue', durable=True)
+        channel.queue_declare(queue='training_response_queue', durable=True)
+
+        def training_callback(ch, method, properties, body):
+            print(f" [*] Training Task received")
+            # Run training, always replying since the API holds identical requests until it does
+            try:
+                result = run_training(json.loads(body))
+            except Exception as e:
+                result = e
+
+            # Send response, tagged with the request correlation id, errors come back as values
+            if result is True:
+                send_reply(channel, properties, 'training_response_queue', 'completed', "Training completed")
+            else:
+                send_reply(channel, properties, 'training_response_queue', 'failed', str(result or "Training failed"))
+
+        # Consume messages
+        channel.basic_consume(queue='training_queue', on_message_callback=training_callback, auto_ack=True)
+
+        print('Training lane waiting for messages...')
+        channel.start_consuming()
+    except AMQPConnectionError:
+        print("Could not establish connection to RabbitMQ after multiple retries")
+        raise
+
+def _start_lane(lane):
+    process = multiprocessing.Process(target=lane, name=lane.__name__)
+    process.start()
+    return process
+
+if __name__ == '__main__':
+    # Run each lane in its own process and restart any that exits
+    lanes = [prediction_lane, training_lane]
+    processes = {lane: _start_lane(lane) for lane in lanes}
 
+    while True:
+        for lane, process in processes.items():
+            if not process.is_alive():
+                print(f" [!] {lane.__name__} exited with code {process.exitcode}, restarting")
+                processes[lane] = _start_lane(lane)
+        time.sleep(5)
@@ -34,8 +34,9 @@ class Preprocessor:
         return operations[0]
 
     def drop_unrelevant(self, df):
-        features_to_drop = ['id', 'link', 'operation', 'street', 'neighborhood', 'city','page_id', 'scraping_date']
-        df = df.drop(features_to_drop, axis=1)
+        features_to_drop = ['id', 'link', 'operation', 'street', 'neighborhood', 'city','page_id', 'scraping_date', 'row_version', 'geo_precision']
+        # Projected fetches leave most of these out already
+        df = df.drop(features_to_drop, axis=1, errors='ignore')
         return df
 
     def drop_empty_loc(self, df):
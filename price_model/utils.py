@@ -1,5 +1,5 @@
 import requests
-import pandas as pd
+import pyarrow as pa
 from preprocessor import Preprocessor
 from model import PriceModel
 
@@ -14,7 +14,7 @@ def run_training(filters: dict):
         # Fetch data
         df = _fetch_data(operation)
 
-        if not df:
+        if df is None or df.empty:
             print(" [!] No data found for the operation")
             return False
 
@@ -42,16 +42,33 @@ def make_prediction(input_data):
         print(f"Error during prediction: {e}")
         return e
 
+# Columns the preprocessor and model use, in table order since the features follow the column order
+TRAINING_COLUMNS = ['operation', 'size', 'dorms', 'toilets', 'garage', 'price', 'additional_costs', 'type',
+                    'latitude', 'longitude']
+
+# Local copy of the last dataset fetched per operation: {operation: (etag, df)}
+_fetched_data = {}
+
 def _fetch_data(operation: str):
     try:
         print(f" [*] Fetching data from API")
-        response = requests.post(f"http://api:8000/properties/filter", json={"operation": operation}, timeout=10)
+        cached = _fetched_data.get(operation)
+
+        # Revalidate the local copy, the API answers 304 when nothing changed
+        headers = {'If-None-Match': cached[0]} if cached else {}
+        response = requests.post(f"http://api:8000/properties/filter", params={"format": "arrow", "columns": ",".join(TRAINING_COLUMNS)}, json={"operation": operation}, timeout=10, headers=headers)
+        if response.status_code == 304 and cached:
+            print(f" [*] Data not modified, using local copy")
+            return cached[1].copy()
         response.raise_for_status() 
-        data = response.json()
 
-        # Convert to dataframe
+        # Convert to dataframe, reusing the Arrow buffers where possible
         print(f" [*] Converting to dataframe")
-        df = pd.DataFrame(data)
+        df = _read_arrow(response.content)
+
+        # Keep a copy for the next training run
+        if 'ETag' in response.headers:
+            _fetched_data[operation] = (response.headers['ETag'], df.copy())
         
         # Return dataframe
         print(f" [*] Returning dataframe")
@@ -59,9 +76,8 @@ def _fetch_data(operation: str):
         
     except Exception as e:
         print(f"Error fetching data: {e}")
-        return False
-    
-    
-    
-
+        return None
 
+def _read_arrow(content):
+    reader = pa.ipc.open_stream(content)
+    return reader.read_pandas(split_blocks=True, self_destruct=True)
@@ -0,0 +1,106 @@
+from driver import Driver
+import psutil
+import os
+
+class BrowserSession:
+    def __init__(self, driver):
+        self.driver = driver
+        self.pages = 0
+        # chromedriver process, the browser and its renderers run as its children
+        self.pid = driver.service.process.pid
+
+class BrowserPool:
+    """ Keeps launched browser sessions alive across scraping tasks.\n
+        Sessions are health-checked before use, reset between tasks and
+        recycled after max_pages pages or once the browser processes use more than max_memory_mb. """
+    def __init__(self, size=1, max_pages=None, max_memory_mb=None):
+        self.config = Driver()
+        self.size = size
+        self.max_pages = max_pages or int(os.getenv('BROWSER_MAX_PAGES', 200))
+        self.max_memory_mb = max_memory_mb or int(os.getenv('BROWSER_MAX_MEMORY_MB', 1024))
+        self._idle = []
+
+    def warm_up(self):
+        """ Launch sessions up to the pool size """
+        while len(self._idle) < self.size:
+            self._idle.append(self._launch())
+        print(f" [*] Browser pool ready with {len(self._idle)} sessions")
+
+    def acquire(self):
+        """ Return a healthy idle session, launching one if none is left """
+        while self._idle:
+            session = self._idle.pop()
+            if self._is_healthy(session):
+                return session
+            print(" [!] Dropping unresponsive browser session")
+            self._quit(session)
+        return self._launch()
+
+    def release(self, session, pages):
+        """ Give a session back after a task that visited the given number of pages """
+        session.pages += pages
+
+        memory_mb = self._memory_mb(session)
+        if session.pages >= self.max_pages or memory_mb >= self.max_memory_mb or not self._is_healthy(session):
+            print(f" [*] Recycling browser session after {session.pages} pages ({memory_mb:.0f} MB resident)")
+            self._quit(session)
+            try:
+                session = self._launch()
+            except Exception as e:
+                # Leave the slot empty, the next acquire launches a new session
+                print(f" [!] Error relaunching browser session: {e}")
+                return
+        else:
+            self._reset(session)
+
+        self._idle.append(session)
+
+    def close(self):
+        while self._idle:
+            self._quit(self._idle.pop())
+
+    def _launch(self):
+        session = BrowserSession(self.config.start_driver())
+        session.driver.get('about:blank')
+        return session
+
+    def _is_healthy(self, session):
+        try:
+            return session.driver.execute_script('return 1') == 1
+        except Exception:
+            return False
+
+    def _memory_mb(self, session):
+        """ Resident memory of chromedriver, the browser and every renderer it spawned """
+        try:
+            service = psutil.Process(session.pid)
+            processes = [service] + service.children(recursive=True)
+        except psutil.Error:
+            return 0
+
+        rss = 0
+        for process in processes:
+            try:
+                rss += process.memory_info().rss
+            except psutil.Error:
+                # Renderers come and go while tabs navigate
+                pass
+        return rss / (1024 * 1024)
+
+    def _reset(self, session):
+        """ Clear cookies and storage left by the previous task """
+        try:
+            session.driver.execute_script('window.localStorage.clear(); window.sessionStorage.clear();')
+        except Exception:
+            pass
+        try:
+            session.driver.execute_cdp_cmd('Network.clearBrowserCookies', {})
+            session.driver.get('about:blank')
+        except Exception as e:
+            print(f" [!] Error resetting browser session: {e}")
+
+    def _quit(self, session):
+        try:
+            session.driver.quit()
+        except Exception:
+            pass
@@ -18,9 +18,10 @@ class Driver:
         self.chrome_options.add_argument('--disable-setuid-sandbox')
         self.chrome_options.add_argument('--disable-dev-shm-usage')
         #self.chrome_options.add_argument('--headless=new')
-        self.service = Service('/usr/local/bin/chromedriver/chromedriver-linux64/chromedriver')
+        self.driver_path = '/usr/local/bin/chromedriver/chromedriver-linux64/chromedriver'
     
     def start_driver(self):
-        driver = webdriver.Chrome(service=self.service, options=self.chrome_options)
+        # A service per driver, so each one keeps its own chromedriver process
+        driver = webdriver.Chrome(service=Service(self.driver_path), options=self.chrome_options)
         #driver = uc.Chrome(options=self.chrome_options)
         return driver
@@ -0,0 +1,74 @@
+from geocode_cache import GeocodeCache
+from collections import defaultdict
+from statistics import median
+import difflib
+
+# Placeholders left by Preprocessor._extract_address for missing address parts
+EMPTY_NAMES = ('', '0', 'nan', 'none')
+
+class Gazetteer:
+    """ Street and neighborhood centroids of addresses geocoded before, per city.\n
+        Names are matched after normalization, falling back to the closest known
+        name, so rows the geocoder can't resolve still get approximate coordinates. """
+    def __init__(self, places, cutoff=0.85):
+        self.cutoff = cutoff
+
+        streets = defaultdict(lambda: defaultdict(list))
+        neighborhoods = defaultdict(lambda: defaultdict(list))
+        for street, neighborhood, city, latitude, longitude in places:
+            # A single name before the city, as in "Centro, São Paulo", is a neighborhood
+            if neighborhood in EMPTY_NAMES:
+                street, neighborhood = '', street
+            if street not in EMPTY_NAMES:
+                streets[city][street].append((latitude, longitude))
+            if neighborhood not in EMPTY_NAMES:
+                neighborhoods[city][neighborhood].append((latitude, longitude))
+
+        self.streets = self._centroids(streets)
+        self.neighborhoods = self._centroids(neighborhoods)
+
+    def __len__(self):
+        return sum(len(names) for places in (self.streets, self.neighborhoods) for names in places.values())
+
+    def locate(self, street, neighborhood, city):
+        """ Return (lat, lng, precision) of the closest known place, None if nothing matches """
+        city = GeocodeCache.normalize(city)
+        if city in EMPTY_NAMES:
+            return None
+        city = self._match(city, set(self.streets) | set(self.neighborhoods))
+        if city is None:
+            return None
+        street = GeocodeCache.normalize(street)
+        neighborhood = GeocodeCache.normalize(neighborhood)
+
+        # Street first, it's the smaller area
+        if street not in EMPTY_NAMES:
+            name = self._match(street, self.streets.get(city, {}))
+            if name is not None:
+                return (*self.streets[city][name], 'street')
+
+        # Addresses like "Centro, São Paulo" end up with the neighborhood in the street field
+        for candidate in (neighborhood, street):
+            if candidate in EMPTY_NAMES:
+                continue
+            name = self._match(candidate, self.neighborhoods.get(city, {}))
+            if name is not None:
+                return (*self.neighborhoods[city][name], 'neighborhood')
+
+        return None
+
+    def _match(self, name, names):
+        if name in names:
+            return name
+        matches = difflib.get_close_matches(name, list(names), n=1, cutoff=self.cutoff)
+        return matches[0] if matches else None
+
+    def _centroids(self, places):
+        # Median rather than mean, one bad geocode shouldn't drag a whole neighborhood
+        return {
+            city: {
+                name: (median(point[0] for point in points), median(point[1] for point in points))
+                for name, points in names.items()
+            }
+            for city, names in places.items()
+        }
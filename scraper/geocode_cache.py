@@ -0,0 +1,89 @@
+import sqlite3
+import unicodedata
+import time
+import re
+import os
+
+class GeocodeCache:
+    """ Geocoding results kept across scraping runs, in a SQLite file under data/.\n
+        Addresses are keyed after normalization. Addresses the provider could not
+        geocode are stored as misses and retried once miss_ttl has passed.
+        Geocoded addresses are also kept split by street, neighborhood and city,
+        the places a Gazetteer builds its centroids from. """
+    MISS = 'miss'
+
+    def __init__(self, path=None, miss_ttl_days=None):
+        self.path = path or os.getenv('GEOCODE_CACHE_PATH', './data/geocode_cache.sqlite')
+        days = miss_ttl_days if miss_ttl_days is not None else float(os.getenv('GEOCODE_MISS_TTL_DAYS', 7))
+        self.miss_ttl = days * 24 * 60 * 60
+
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self.connection = sqlite3.connect(self.path)
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS geocodes ('
+            'address TEXT PRIMARY KEY, latitude REAL, longitude REAL, '
+            'found INTEGER NOT NULL, updated_at REAL NOT NULL)'
+        )
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS places ('
+            'street TEXT NOT NULL, neighborhood TEXT NOT NULL, city TEXT NOT NULL, '
+            'latitude REAL NOT NULL, longitude REAL NOT NULL, '
+            'PRIMARY KEY (street, neighborhood, city))'
+        )
+        self.connection.commit()
+
+    @staticmethod
+    def normalize(address):
+        """ Lowercase, strip accents and punctuation, collapse spaces """
+        address = unicodedata.normalize('NFKD', str(address))
+        address = ''.join(char for char in address if not unicodedata.combining(char))
+        address = re.sub(r'[^\w]+', ' ', address.lower())
+        return ' '.join(address.split())
+
+    def get(self, address):
+        """ Return (lat, lng), MISS for a recent miss, None if the address must be looked up """
+        row = self.connection.execute(
+            'SELECT latitude, longitude, found, updated_at FROM geocodes WHERE address = ?',
+            (self.normalize(address),)
+        ).fetchone()
+        if row is None:
+            return None
+
+        latitude, longitude, found, updated_at = row
+        if found:
+            return latitude, longitude
+        if time.time() - updated_at < self.miss_ttl:
+            return self.MISS
+        return None
+
+    def put(self, address, latitude, longitude):
+        self._store(address, latitude, longitude, True)
+
+    def put_miss(self, address):
+        self._store(address, None, None, False)
+
+    def put_places(self, places):
+        """ Store geocoded (street, neighborhood, city, lat, lng) tuples """
+        self.connection.executemany(
+            'INSERT OR REPLACE INTO places (street, neighborhood, city, latitude, longitude) VALUES (?, ?, ?, ?, ?)',
+            [(self.normalize(street), self.normalize(neighborhood), self.normalize(city), latitude, longitude)
+             for street, neighborhood, city, latitude, longitude in places]
+        )
+        self.connection.commit()
+
+    def places(self):
+        """ All stored places, with normalized names """
+        return self.connection.execute(
+            'SELECT street, neighborhood, city, latitude, longitude FROM places'
+        ).fetchall()
+
+    def close(self):
+        self.connection.close()
+
+    def _store(self, address, latitude, longitude, found):
+        self.connection.execute(
+            'INSERT OR REPLACE INTO geocodes (address, latitude, longitude, found, updated_at) VALUES (?, ?, ?, ?, ?)',
+            (self.normalize(address), latitude, longitude, int(found), time.time())
+        )
+        # Commit every result, so an interrupted run keeps what it already paid for
+        self.connection.commit()
@@ -0,0 +1,126 @@
+import aiohttp
+import asyncio
+import random
+import time
+import os
+
+class TokenBucket:
+    """ Allows rate requests per second on average, with bursts up to capacity """
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+class AsyncGeocoder:
+    """ Geocodes addresses concurrently over one keep-alive session.\n
+        Requests go through a token bucket matched to the provider quota, rate limits
+        and server errors are retried with exponential backoff. """
+    def __init__(self, api_url, api_key, rate=None, concurrency=None, max_retries=5, timeout=30):
+        self.api_url = api_url
+        self.api_key = api_key
+        # LocationIQ free tier allows 2 requests per second
+        self.rate = float(rate or os.getenv('GEOCODE_RATE', 2))
+        self.concurrency = int(concurrency or os.getenv('GEOCODE_CONCURRENCY', 4))
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.requests = 0
+        self.retries = 0
+        self.errors = 0
+
+    def geocode(self, addresses, on_result=None):
+        """ Return {address: (lat, lng)}, or None for addresses that can't be geocoded.\n
+            Addresses that kept failing are left out, so they aren't taken as misses.\n
+            on_result(address, result) is called as each lookup completes, so results can be
+            persisted before the whole batch is done. """
+        if not addresses:
+            return {}
+        return asyncio.run(self._geocode_all(addresses, on_result))
+
+    async def _geocode_all(self, addresses, on_result):
+        bucket = TokenBucket(self.rate)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        connector = aiohttp.TCPConnector(limit=self.concurrency)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        headers = {"accept": "application/json"}
+
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout, headers=headers) as session:
+            async def lookup(address):
+                async with semaphore:
+                    try:
+                        result = await self._request(session, bucket, address)
+                    except Exception as e:
+                        # One bad lookup must not take the finished ones down with it
+                        print(f"Error requesting lat, lng for {address}: {e}")
+                        self.errors += 1
+                        result = False
+                if result is not False and on_result is not None:
+                    on_result(address, result)
+                return address, result
+
+            results = {}
+            for address, result in await asyncio.gather(*[lookup(address) for address in addresses]):
+                if result is not False:
+                    results[address] = result
+            return results
+
+    async def _request(self, session, bucket, address):
+        """ Return (lat, lng), None when nothing matches, False after exhausting retries """
+        params = {'key': self.api_key, 'q': address, 'format': 'json', 'limit': 1}
+
+        for attempt in range(self.max_retries + 1):
+            await bucket.acquire()
+            self.requests += 1
+            retry_after = None
+            try:
+                async with session.get(self.api_url, params=params) as response:
+                    # LocationIQ answers 404 when nothing matches the address
+                    if response.status == 404:
+                        return None
+                    if response.status == 429 or response.status >= 500:
+                        retry_after = response.headers.get('Retry-After')
+                        raise aiohttp.ClientResponseError(
+                            response.request_info, response.history,
+                            status=response.status, message=response.reason
+                        )
+                    response.raise_for_status()
+
+                    try:
+                        results = await response.json(content_type=None)
+                        if not results:
+                            return None
+                        return float(results[0]['lat']), float(results[0]['lon'])
+                    except (ValueError, KeyError, IndexError, TypeError) as e:
+                        # Unexpected body, like an HTML error page from a proxy, retry it
+                        raise aiohttp.ClientPayloadError(f"Unexpected geocoding response: {e!r}") from e
+
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if isinstance(e, aiohttp.ClientResponseError) and e.status < 500 and e.status != 429:
+                    print(f"Error requesting lat, lng for {address}: {e}")
+                    break
+                if attempt == self.max_retries:
+                    print(f"Giving up on lat, lng for {address}: {e}")
+                    break
+
+                self.retries += 1
+                await asyncio.sleep(self._backoff(attempt, retry_after))
+
+        self.errors += 1
+        return False
+
+    def _backoff(self, attempt, retry_after=None):
+        if retry_after and retry_after.isdigit():
+            return float(retry_after)
+        return min(60, 2 ** attempt) + random.uniform(0, 0.5)
@@ -5,8 +5,14 @@ class Loader:
     def __init__(self):
         self.df = None
         self.api_url = "http://api:8000/load-data"
+        self.stream_url = "http://api:8000/load-data/stream"
+        self.stream = True
 
     def load_data(self, file_name):
+        # Upload the CSV as is, the API copies it straight into Postgres
+        if self.stream:
+            return self._stream_file(file_name)
+
         self._load_df(file_name)
         result = self._make_request()
         return result
@@ -19,6 +25,10 @@ class Loader:
             # Rename id col to page_id
             df = self.df.rename(columns={'id': 'page_id'})
 
+            # Rows without coordinates have no precision, send null rather than NaN
+            if 'geo_precision' in df.columns:
+                df['geo_precision'] = df['geo_precision'].astype(object).where(df['geo_precision'].notna(), None)
+
             # Convert DataFrame to list of dictionaries
             data_list = df.to_dict(orient="records")
             # Send the list directly as the JSON payload
@@ -35,4 +45,22 @@ class Loader:
             print(f"Error loading data: {e}")
             return False
 
+    def _stream_file(self, file_name):
+        try:
+            # Passing the file object makes requests stream it in chunks
+            with open(file_name, 'rb') as file:
+                response = requests.post(
+                    self.stream_url,
+                    params={'format': 'csv'},
+                    data=file,
+                    headers={'Content-Type': 'text/csv'}
+                )
+            response.raise_for_status()
+            result = response.json()
+            print(f" [*] Load result: {result}")
+
+            return bool(result['success'])
 
+        except Exception as e:
+            print(f"Error streaming data: {e}")
+            return False
@@ -1,4 +1,5 @@
 from pipeline import pipeline
+from browser_pool import BrowserPool
 import pika
 import json
 import time
@@ -26,7 +27,31 @@ def create_connection():
                 raise e
             time.sleep(5)  # Wait 5 seconds before retrying
 
+def _json_default(value):
+    # numpy and pandas scalars
+    return value.item() if hasattr(value, 'item') else str(value)
+
+def send_reply(channel, properties, default_queue, status, payload):
+    """Publish a JSON reply, {"status": "completed", "result": ...} or {"status": "failed", "error": ...},
+    tagged with the request correlation id"""
+    key = 'result' if status == 'completed' else 'error'
+    channel.basic_publish(
+        exchange='',
+        routing_key=properties.reply_to or default_queue,
+        body=json.dumps({'status': status, key: payload}, default=_json_default),
+        properties=pika.BasicProperties(delivery_mode=2, correlation_id=properties.correlation_id,
+                                        content_type='application/json')
+    )
+
 try:
+    # Launch browsers once, they're reused across tasks. If they can't start now,
+    # the first task that needs one launches it instead of the worker exiting
+    browser_pool = BrowserPool()
+    try:
+        browser_pool.warm_up()
+    except Exception as e:
+        print(f" [!] Error warming up browser pool: {e}")
+
     connection = create_connection()
     channel = connection.channel()
 
@@ -34,19 +59,21 @@ try:
     channel.queue_declare(queue='scraper_response_queue', durable=True)
 
     def callback(ch, method, properties, body):
-        print(f"Task received: {json.loads(body)}")
-
-        # Run pipeline
-        report = pipeline(json.loads(body))
-        print(f" [*] Report: {report}")
-
-        # Send response
-        channel.basic_publish(
-            exchange='',
-            routing_key='scraper_response_queue',
-            body=f"Task completed.\nInput: {json.loads(body)}\nReport: {report}",
-            properties=pika.BasicProperties(delivery_mode=2)
-        )
+        try:
+            print(f"Task received: {json.loads(body)}")
+
+            # Run pipeline
+            report = pipeline(json.loads(body), browser_pool)
+            print(f" [*] Report: {report}")
+        except Exception as e:
+            # Always reply, the API holds identical requests on this job until it does
+            report = {'message': 'Error in pipeline', 'error': str(e)}
+
+        # Send response, tagged with the request correlation id
+        if 'error' in report:
+            send_reply(channel, properties, 'scraper_response_queue', 'failed', report['error'])
+        else:
+            send_reply(channel, properties, 'scraper_response_queue', 'completed', report)
 
     # Consume messages
     channel.basic_consume(queue='scraper_queue', on_message_callback=callback, auto_ack=True)
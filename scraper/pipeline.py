@@ -1,10 +1,14 @@
 from scraper.scraper import Scraper
+from scraper.parallel import ParallelScraper
+from scraper.http_scraper import HttpScraper
+from scraper.sink import CsvSink
+from scraper.known import KnownListings
 from preprocessor import Preprocessor
 from loader import Loader
 from driver import Driver
 import os
 
-def pipeline(input):
+def pipeline(input, browser_pool=None):
     try:
         # Get operations list
         tasks = input['tasks']
@@ -16,7 +20,7 @@ def pipeline(input):
 
         # Run scraping pipeline
         if 'scrape' in tasks:
-            scraping_report = run_scraping(input)
+            scraping_report = run_scraping(input, browser_pool)
             print(f" [*] Scraping report: {scraping_report}")
 
         # Preprocess data
@@ -49,21 +53,50 @@ def pipeline(input):
             'error': str(e)
             }
 
-def run_scraping(input):
-    # Check if file exists, if so skip scrapping
-    if _check_if_file_exists(input['file_name'], input['date']):
+def run_scraping(input, browser_pool=None):
+    # Check if file exists and was fully scraped, if so skip scrapping
+    if _check_if_file_exists(input['file_name'], input['date']) and not _is_scrape_incomplete(input['file_name'], input['date']):
         return {
             'message': 'File already exists, skipping scrapping',
             'file_name': f'data/{input["date"]}/{input["file_name"]}.csv'
             }
     
+    # Incremental scrapes skip listings already in the database, walking pages in order
+    known = None
+    if input.get('incremental'):
+        known = KnownListings.fetch(input['operation'], input.get('stop_fraction'))
+
+    # Split pages across several browsers if requested
+    workers = int(input.get('workers', 1))
+    if workers > 1 and known is None:
+        scraper = ParallelScraper(input['date'], workers)
+        return scraper.start(input['url'], input['pages'], input['file_name'], input['operation'])
+
+    # Fetch pages over HTTP, using a browser only for pages that need it
+    if input.get('fetch_mode') == 'http':
+        scraper = HttpScraper(input['date'], browser_pool)
+        return scraper.start(input['url'], input['pages'], input['file_name'], input['operation'],
+                             resume=True, known=known)
+
+    # Reuse a warm browser when the worker keeps a pool
+    if browser_pool is not None:
+        session = browser_pool.acquire()
+        scraper = Scraper(session.driver, input['date'], quit_driver=False,
+                          parse_workers=int(input.get('parse_workers', 0)))
+        try:
+            return scraper.start(input['url'], input['pages'], input['file_name'], input['operation'],
+                                 resume=True, known=known)
+        finally:
+            browser_pool.release(session, scraper.pages_visited)
+
     # Initialize the webdriver
     config = Driver()
     driver = config.start_driver()
     
-    scraper = Scraper(driver, input['date'])
+    scraper = Scraper(driver, input['date'], parse_workers=int(input.get('parse_workers', 0)))
 
-    report = scraper.start(input['url'], input['pages'], input['file_name'], input['operation'])
+    report = scraper.start(input['url'], input['pages'], input['file_name'], input['operation'],
+                           resume=True, known=known)
 
     return report
 
@@ -104,7 +137,8 @@ def fetch_lat_lng(file_name, date):
 
     return {
         'message': 'Fetching lat, lng finished',
-        'file_path': f'data/{date}/{saved_file_name}'
+        'file_path': f'data/{date}/{saved_file_name}',
+        'geocode_stats': preprocessor.geocode_stats
         }
 
 def load_data(file_name, date):
@@ -141,6 +175,13 @@ def load_data(file_name, date):
             }
 
 
+def _is_scrape_incomplete(file_name, date):
+    sink = CsvSink(f'data/{date}/{file_name}.csv', [])
+    if sink.is_incomplete():
+        print(f" [*] Previous scraping of {file_name} did not finish, resuming")
+        return True
+    return False
+
 def _check_if_file_exists(file_name, date):
     file_path = f'data/{date}/{file_name}.csv'
     if os.path.exists(file_path):
@@ -1,9 +1,10 @@
 import pandas as pd
 import re
-import requests
-import time
 import os
 from geopy.distance import geodesic
+from geocode_cache import GeocodeCache
+from geocoder import AsyncGeocoder
+from gazetteer import Gazetteer
 
 class Preprocessor:
     def __init__(self):
@@ -11,6 +12,7 @@ class Preprocessor:
         self.api_url = "https://us1.locationiq.com/v1/search"
         self.API_KEY = os.getenv('LOCATION_IQ_API_KEY')
         self.file_name_saving = None
+        self.geocode_stats = {}
 
     def preprocess_data(self, file_name):
         # Load raw data
@@ -38,35 +40,88 @@ class Preprocessor:
         self.df = pd.read_csv(file_name)
 
         print(f" [*] Getting lat, lng for {file_name}")
+        cache = GeocodeCache()
+        stats = {'rows_missing': 0, 'unique_addresses': 0, 'cache_hits': 0,
+                 'cached_misses': 0, 'api_requests': 0, 'api_retries': 0, 'api_found': 0, 'api_errors': 0,
+                 'offline_skipped': 0, 'gazetteer_street': 0, 'gazetteer_neighborhood': 0}
         try:
-            # Loop through each row
-            api_requests = 0
-            for index, row in self.df.iterrows():
-                # Check if lat, lng is already in df
-                if self.df.at[index, 'latitude'] != 0.0 and self.df.at[index, 'longitude'] != 0.0:
-                    continue
-
-                # Extract full address for query
-                address = f"{row['street']}, {row['neighborhood']}, {row['city']}"
-
-                # Make request
-                lat, lng = self._request_lat_lng(address)
-
-                # Check if returned lat, lng, jump to next row
-                if lat is None or lng is None:
-                    continue
-
-                # Include lat, lng
-                self.df.at[index, 'latitude'] = float(lat)
-                self.df.at[index, 'longitude'] = float(lng)
-                api_requests += 1
+            # Rows still without lat, lng
+            missing = (self.df['latitude'] == 0.0) | (self.df['longitude'] == 0.0)
+            stats['rows_missing'] = int(missing.sum())
+
+            # Coordinates found before are exact addresses
+            if 'geo_precision' not in self.df.columns:
+                self.df['geo_precision'] = None
+            self.df.loc[~missing & self.df['geo_precision'].isna(), 'geo_precision'] = 'address'
+
+            # Extract full address for query, grouping rows that share it
+            addresses = (self.df.loc[missing, 'street'].astype(str) + ', '
+                         + self.df.loc[missing, 'neighborhood'].astype(str) + ', '
+                         + self.df.loc[missing, 'city'].astype(str))
+            keys = addresses.map(GeocodeCache.normalize)
+            groups = addresses.groupby(keys).groups
+            stats['unique_addresses'] = len(groups)
+
+            # Serve what the cache knows, collect the rest for the geocoder
+            resolved = {}
+            pending = []
+            for key, index in groups.items():
+                address = addresses.loc[index[0]]
+                result = cache.get(address)
+
+                if result is GeocodeCache.MISS:
+                    stats['cached_misses'] += 1
+                elif result is not None:
+                    stats['cache_hits'] += 1
+                    resolved[key] = result
+                else:
+                    pending.append(address)
+
+            # Without an API key, or when asked to stay offline, leave them to the gazetteer
+            if not self.API_KEY or os.getenv('GEOCODE_OFFLINE') == '1':
+                stats['offline_skipped'] = len(pending)
+                pending = []
+
+            # Geocode the remaining addresses concurrently, under the provider rate limit,
+            # caching each result as it arrives so an interrupted run keeps what it paid for
+            def store_result(address, result):
+                if result is None:
+                    cache.put_miss(address)
+                    return
+                cache.put(address, *result)
+                resolved[GeocodeCache.normalize(address)] = result
+                stats['api_found'] += 1
+
+            geocoder = AsyncGeocoder(self.api_url, self.API_KEY)
+            geocoder.geocode(pending, on_result=store_result)
+            stats['api_requests'] = geocoder.requests
+            stats['api_retries'] = geocoder.retries
+            stats['api_errors'] = geocoder.errors
+
+            # Include lat, lng in every row with a resolved address
+            for key, (lat, lng) in resolved.items():
+                self.df.loc[groups[key], 'latitude'] = float(lat)
+                self.df.loc[groups[key], 'longitude'] = float(lng)
+                self.df.loc[groups[key], 'geo_precision'] = 'address'
+
+            # Reset far off geocodes first, so they don't feed the street and neighborhood centroids
+            if handle_outliers:
+                self.handle_lat_lng_outliers()
+
+            # Fill what's left from street and neighborhood centroids, no API call needed
+            self._fill_from_gazetteer(cache, stats)
 
         except Exception as e:
             print(f"Error including lat, lng: {e}")
+        finally:
+            cache.close()
 
-        print(f" [*] API requests: {api_requests}")
+        lookups = stats['unique_addresses']
+        stats['hit_rate'] = round((stats['cache_hits'] + stats['cached_misses']) / lookups, 3) if lookups else 0.0
+        self.geocode_stats = stats
+        print(f" [*] Geocoding stats: {stats}")
 
-        # Handle outliers
+        # Centroids stored by earlier runs can be off too
         if handle_outliers:
             self.handle_lat_lng_outliers()
 
@@ -79,30 +134,39 @@ class Preprocessor:
         return self.file_name_saving
 
        
-    def _request_lat_lng(self, address):
-        try:
-            # API limit
-            time.sleep(0.75)
-
-            url = f"{self.api_url}?key={self.API_KEY}&q={address}&format=json&limit=1"
-            header = {"accept": "application/json"}
-            response = requests.get(url, headers=header)
-            response.raise_for_status()
-            lat = response.json()[0]['lat']
-            lng = response.json()[0]['lon']
-            return lat, lng
-        
-        except Exception as e:
-            print(f"Error requesting lat, lng: {e}")
-            return None, None
-    
+    def _fill_from_gazetteer(self, cache, stats):
+        address_cols = ['street', 'neighborhood', 'city']
+
+        # Exact addresses of this file feed the gazetteer for this and later runs
+        exact = self.df[self.df['geo_precision'] == 'address'].drop_duplicates(address_cols)
+        cache.put_places(exact[address_cols + ['latitude', 'longitude']].itertuples(index=False, name=None))
+
+        gazetteer = Gazetteer(cache.places())
+        if not len(gazetteer):
+            return
+
+        missing = (self.df['latitude'] == 0.0) | (self.df['longitude'] == 0.0)
+        for (street, neighborhood, city), index in self.df[missing].groupby(address_cols).groups.items():
+            place = gazetteer.locate(street, neighborhood, city)
+            if place is None:
+                continue
+
+            lat, lng, precision = place
+            self.df.loc[index, 'latitude'] = lat
+            self.df.loc[index, 'longitude'] = lng
+            self.df.loc[index, 'geo_precision'] = precision
+            stats[f'gazetteer_{precision}'] += len(index)
+
     def save_to_csv(self, file_name):
         self.df.to_csv(file_name, index=False)
 
     def handle_lat_lng_outliers(self, max_distance_km=20):
-        # Compute central point (mean latitude & longitude)
-        center_lat = self.df["latitude"].mean()
-        center_lng = self.df["longitude"].mean()
+        # Compute central point (mean latitude & longitude) of the rows with coordinates
+        located = (self.df["latitude"] != 0.0) & (self.df["longitude"] != 0.0)
+        if not located.any():
+            return
+        center_lat = self.df.loc[located, "latitude"].mean()
+        center_lng = self.df.loc[located, "longitude"].mean()
         center_point = (center_lat, center_lng)
 
         # Compute distances for each point
@@ -117,8 +181,10 @@ class Preprocessor:
         # Flag outliers (beyond 20km)
         self.df["is_outlier"] = self.df["distance_from_center"] > max_distance_km
 
-        # Flag outliers
+        # Reset outliers, they no longer have a location of any precision
         self.df.loc[self.df["is_outlier"], ["latitude", "longitude"]] = 0.0
+        if "geo_precision" in self.df.columns:
+            self.df.loc[self.df["is_outlier"], "geo_precision"] = None
 
         # Drop helper columns
         self.df.drop(columns=["distance_from_center", "is_outlier"], inplace=True)
@@ -158,15 +224,24 @@ class Preprocessor:
       
       self.df["size"] = self.df["size"].apply(_extract_size)
     
-    def _clean_price(self):
-      def _extract_price(price):
+    @staticmethod
+    def parse_price(price):
         # Pattern R$ XXXX/mês
         match = re.search(r"R\$[\s]?([\d.,]+)", str(price))
         if match:
             return int(match.group(1).replace(".", "").replace(",", ""))
         return 0
-      
-      self.df["price"] = self.df["price"].apply(_extract_price)
+
+    @staticmethod
+    def parse_id(page_id):
+        # Same normalization as _clean_ids, for a single raw id
+        try:
+            return str(int(float(page_id)))
+        except (TypeError, ValueError):
+            return '0'
+
+    def _clean_price(self):
+      self.df["price"] = self.df["price"].apply(self.parse_price)
 
     def _clean_additional_costs(self):
       def _extract_additional_costs(costs):
@@ -228,3 +303,4 @@ class Preprocessor:
       # Initiate lat, lng
       self.df['latitude'] = 0.0
       self.df['longitude'] = 0.0
+      self.df['geo_precision'] = None
@@ -0,0 +1,35 @@
+import json
+import os
+import time
+
+class Checkpoint:
+    """ Progress record of a scrape, stored next to its output file.\n
+        Rewritten atomically after every saved page with the last completed page,
+        the url to continue from and the running counters. """
+    def __init__(self, file_name):
+        self.path = f'{file_name}.checkpoint.json'
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path) as file:
+                return json.load(file)
+        except ValueError:
+            print(f'Ignoring unreadable checkpoint {self.path}')
+            return None
+
+    def save(self, **state):
+        state['updated_at'] = time.time()
+
+        # Write aside and rename, so a crash never leaves a half written checkpoint
+        temp_path = f'{self.path}.tmp'
+        with open(temp_path, 'w') as file:
+            json.dump(state, file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, self.path)
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
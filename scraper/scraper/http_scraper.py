@@ -0,0 +1,173 @@
+from scraper.scraper import Scraper
+from scraper.navigator import Navigator
+from scraper.extractor import Extractor
+from scraper.sink import CsvSink
+from scraper.checkpoint import Checkpoint
+from driver import Driver
+import aiohttp
+import asyncio
+import time
+
+class HttpFetcher:
+    """ Fetches pages concurrently over HTTP, reusing keep-alive connections.\n
+        One event loop and session live across calls until close(), so connections
+        opened by a batch serve the next ones. """
+    def __init__(self, concurrency=4, timeout=30):
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self._loop = None
+        self._session = None
+        self.headers = {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36',
+            'Accept-Language': 'en-US,en;q=0.9',
+            'Referer': 'https://www.google.com/'
+        }
+
+    def fetch_pages(self, urls):
+        """ Return the page sources in the same order as urls, None for failed fetches """
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+        return self._loop.run_until_complete(self._fetch_all(urls))
+
+    def close(self):
+        """ Close the session and its connections, the next fetch opens new ones """
+        if self._loop is None:
+            return
+        if self._session is not None:
+            self._loop.run_until_complete(self._session.close())
+            self._session = None
+        self._loop.close()
+        self._loop = None
+
+    async def _fetch_all(self, urls):
+        # The session is bound to the loop, so it's opened from inside it
+        if self._session is None:
+            connector = aiohttp.TCPConnector(limit=self.concurrency)
+            timeout = aiohttp.ClientTimeout(total=self.timeout)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=timeout, headers=self.headers)
+        return await asyncio.gather(*[self._fetch(self._session, url) for url in urls])
+
+    async def _fetch(self, session, url):
+        try:
+            async with session.get(url) as response:
+                response.raise_for_status()
+                return await response.text()
+        except Exception as e:
+            print(f"Error fetching {url}: {e}")
+            return None
+
+class HttpScraper(Scraper):
+    """ Scrapes result pages over plain HTTP, parsing them with the same Extractor.\n
+        Pages whose markup has no cards (rendered client side, blocked, failed fetch)
+        are loaded again in a browser, launched only when first needed. """
+    def __init__(self, script_date, browser_pool=None, concurrency=4):
+        super().__init__(None, script_date, quit_driver=False)
+        self.browser_pool = browser_pool
+        self.fetcher = HttpFetcher(concurrency)
+        self._session = None
+        self.http_pages = 0
+        self.browser_pages = 0
+
+    def start(self, url, pages, file_name, operation, resume=False, known=None):
+        """ Same contract as Scraper.start """
+        start_time = time.time()
+        extractor = Extractor()
+        self.known = known
+        self.reached_known = False
+
+        # Initialize file, or pick up where a previous run stopped
+        full_file_name = self._initialize_file(file_name)
+        sink = CsvSink(full_file_name, self.ref_cols)
+        checkpoint = Checkpoint(full_file_name)
+        run = {'url': url, 'operation': operation, 'first_page': 1, 'pages': pages}
+
+        start_page = self._resume(sink, checkpoint, run) if resume else None
+        if start_page is None:
+            sink.initialize()
+            checkpoint.clear()
+            start_page = 1
+
+        try:
+            self._scrape_pages(url, pages, start_page, operation, extractor, sink, checkpoint, run)
+            sink.finish()
+            checkpoint.clear()
+        finally:
+            # Give a pooled browser back and close connections even when the scrape fails
+            self._close_browser()
+            self.fetcher.close()
+
+        print(f'Pages fetched over HTTP: {self.http_pages}, in browser: {self.browser_pages}')
+
+        report = self._get_summary(start_time, full_file_name)
+        if known is not None:
+            report['known_skipped'] = known.skipped
+        self.scrapped_entries = 0
+        self.errors = 0
+        return report
+
+    def _scrape_pages(self, url, pages, start_page, operation, extractor, sink, checkpoint, run):
+        # Fetch a few pages at a time, so page sources don't pile up in memory
+        batch_size = self.fetcher.concurrency * 2
+        for first_page in range(start_page, pages + 1, batch_size):
+            page_numbers = list(range(first_page, min(first_page + batch_size, pages + 1)))
+            sources = self.fetcher.fetch_pages([Navigator.page_url(url, page) for page in page_numbers])
+
+            for page, source in zip(page_numbers, sources):
+                print(f'Scraping page {page} of {pages}')
+                data, scrapped_entries, errors = extractor.parse_page(source, operation) if source else ([], 0, 0)
+
+                if data:
+                    self.http_pages += 1
+                else:
+                    data, scrapped_entries, errors, source = self._scrape_with_browser(Navigator.page_url(url, page), operation)
+
+                # Only the pagination tells the last page apart from a page that failed to load
+                has_next = extractor.parser.has_next_page(source) if source else None
+                if not data:
+                    if has_next is False:
+                        print(f'Page {page} is past the last results page')
+                        return
+                    raise RuntimeError(f'No cards found on page {page}, even in the browser')
+
+                self._save_data(sink, checkpoint, run, page, data, scrapped_entries, errors)
+
+                if has_next is False:
+                    print(f'Page {page} is the last results page')
+                    return
+
+                # Incremental scrape reached listings already in the database
+                if self.reached_known:
+                    return
+
+    def _scrape_with_browser(self, page_url, operation):
+        """ Load a page in the browser, return its cards as scrape_page does and the page source """
+        print(f'No cards in HTTP response, loading {page_url} in browser')
+        driver = self._browser()
+        navigator = Navigator(driver)
+
+        driver.get(page_url)
+        navigator.wait_for_page_ready()
+        self.browser_pages += 1
+        if not navigator.scroll_down():
+            return [], 0, 0, driver.page_source
+        data, scrapped_entries, errors = Extractor(driver).scrape_page(operation)
+        return data, scrapped_entries, errors, driver.page_source
+
+    def _browser(self):
+        if self.driver is None:
+            if self.browser_pool is not None:
+                self._session = self.browser_pool.acquire()
+                self.driver = self._session.driver
+            else:
+                self.driver = Driver().start_driver()
+        return self.driver
+
+    def _close_browser(self):
+        if self.driver is None:
+            return
+        if self._session is not None:
+            self.browser_pool.release(self._session, self.browser_pages)
+        else:
+            self.driver.quit()
+        self.driver = None
+        self._session = None
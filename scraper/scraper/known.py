@@ -0,0 +1,44 @@
+from preprocessor import Preprocessor
+import requests
+import os
+
+class KnownListings:
+    """ Listings already stored in the database for an operation, page_id -> price.\n
+        Used by incremental scrapes to send only new or repriced cards downstream and
+        to stop paginating once a page is mostly made of listings seen before. """
+    api_url = "http://api:8000/properties/known"
+    # Seconds to connect and between bytes of the response, an unresponsive API must not hang the scrape
+    timeout = 30
+
+    def __init__(self, prices, stop_fraction=None):
+        self.prices = prices
+        self.stop_fraction = float(stop_fraction if stop_fraction is not None else os.getenv('INCREMENTAL_STOP_FRACTION', 0.8))
+        self.skipped = 0
+
+    @classmethod
+    def fetch(cls, operation, stop_fraction=None):
+        """ Download the known page_ids for the operation, None if the API can't be reached """
+        try:
+            response = requests.get(cls.api_url, params={'operation': operation}, timeout=cls.timeout)
+            response.raise_for_status()
+            result = response.json()
+        except Exception as e:
+            print(f"Error fetching known listings: {e}")
+            return None
+
+        print(f" [*] Known listings for {operation}: {result['count']}")
+        return cls(dict(zip(result['page_ids'], result['prices'])), stop_fraction)
+
+    def split(self, cards):
+        """ Return the new or changed cards and the fraction of cards known and unchanged """
+        if not cards:
+            return cards, 0.0
+
+        fresh = [card for card in cards if not self._is_unchanged(card)]
+        unchanged = len(cards) - len(fresh)
+        self.skipped += unchanged
+        return fresh, unchanged / len(cards)
+
+    def _is_unchanged(self, card):
+        known_price = self.prices.get(Preprocessor.parse_id(card['id']))
+        return known_price is not None and known_price == Preprocessor.parse_price(card['price'])
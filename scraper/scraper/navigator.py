@@ -1,20 +1,41 @@
 from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
+from scraper.pacing import AdaptivePacer
+from urllib.parse import urlparse, parse_qs, urlencode, urlunparse
 import time
 
+CARD_SELECTOR = 'div[data-cy="rp-property-cd"]'
+PAGINATION_SELECTOR = 'nav[data-testid="l-pagination"].l-pagination'
+RECOMMENDATIONS_SELECTOR = 'div[data-testid="recommendations-list"]'
+
 class Navigator:
-    def __init__(self, driver):
+    def __init__(self, driver, pacer=None):
         self.driver = driver
-        self.scroll_delay = 8
+        self.pacer = pacer or AdaptivePacer()
+        self.stable_polls = 2
         self.scroll_already_refreshed = False
     
+    @staticmethod
+    def page_url(url, page):
+        """ Return the url of the given results page, through the 'pagina' query param """
+        if page <= 1:
+            return url
+        parts = urlparse(url)
+        query = parse_qs(parts.query, keep_blank_values=True)
+        query['pagina'] = [str(page)]
+        return urlunparse(parts._replace(query=urlencode(query, doseq=True)))
+
     def scroll_down(self):
         print("Scrolling down...")
         try:
             scrolls = 5
+            cards = 0
             for _ in range(scrolls):
                 try:
                     # First try to get the bottom navbar
-                    navbar = self.driver.find_elements(By.CSS_SELECTOR, 'nav[data-testid="l-pagination"].l-pagination')
+                    navbar = self.driver.find_elements(By.CSS_SELECTOR, PAGINATION_SELECTOR)
                     self.driver.execute_script("arguments[0].scrollIntoView({behavior: 'smooth', block: 'center'});", navbar[0])
                 except:
                     try:
@@ -24,32 +45,101 @@ class Navigator:
                     except:
                         try:
                             # Finally, try recommendations at the bottom
-                            page_bottom = self.driver.find_elements(By.CSS_SELECTOR, 'div[data-testid="recommendations-list"]')
+                            page_bottom = self.driver.find_elements(By.CSS_SELECTOR, RECOMMENDATIONS_SELECTOR)
                             self.driver.execute_script("arguments[0].scrollIntoView({behavior: 'smooth', block: 'center'});", page_bottom[0])
                         except:
                             # Otherside trigger exception
                             raise Exception("No scrollable element found")
                 
-                time.sleep(self.scroll_delay)
+                # Lazy loading is done once a scroll adds no cards and the pagination is rendered
+                previous_cards = cards
+                cards, settled = self.wait_for_cards()
+                if cards > 0 and cards == previous_cards and self._pagination_present():
+                    break
+                # Further scrolls won't settle a page that never renders cards, or keeps changing them
+                if not settled or cards == 0:
+                    break
             self.scroll_already_refreshed = False
             return True
         except:
             if not self.scroll_already_refreshed:
                 print("Error scrolling down.\nRefreshing page..")
                 self._refresh_page()
-                self.scroll_down()
+                return self.scroll_down()
             else:
                 print("Error scrolling down.\nSkipping page..")
                 self.scroll_already_refreshed = False
                 return False
 
+    def wait_for_page_ready(self):
+        """ Wait for document ready state, return False on timeout """
+        start = time.time()
+        try:
+            WebDriverWait(self.driver, self.pacer.timeout, poll_frequency=self.pacer.poll_interval).until(
+                lambda driver: driver.execute_script('return document.readyState') == 'complete'
+            )
+            self.pacer.record_load(time.time() - start)
+            return True
+        except TimeoutException:
+            print("Timed out waiting for page to load")
+            self.pacer.record_failure()
+            return False
+
+    def wait_for_cards(self):
+        """ Wait until the number of listing cards stops changing, return the count and
+            whether it settled before the timeout.\n
+            A page showing its end markers without cards is settled at 0 right away, it has
+            nothing to load. Timeouts aren't recorded as pacer failures, an empty page isn't a slow one. """
+        start = time.time()
+        deadline = start + self.pacer.timeout
+        last_count, stable = -1, 0
+
+        while time.time() < deadline:
+            count = len(self.driver.find_elements(By.CSS_SELECTOR, CARD_SELECTOR))
+            if count == last_count and (count > 0 or self._page_end_present()):
+                stable += 1
+                if stable >= self.stable_polls:
+                    if count > 0:
+                        self.pacer.record_load(time.time() - start)
+                    return count, True
+            else:
+                stable = 0
+            last_count = count
+            time.sleep(self.pacer.poll_interval)
+
+        print("Timed out waiting for cards to settle")
+        return max(last_count, 0), False
+
+    def _page_end_present(self):
+        return self._pagination_present() or len(self.driver.find_elements(By.CSS_SELECTOR, RECOMMENDATIONS_SELECTOR)) > 0
+
+    def _pagination_present(self):
+        return len(self.driver.find_elements(By.CSS_SELECTOR, PAGINATION_SELECTOR)) > 0
+
+    def _wait_for_page_change(self, old_card):
+        """ Wait for a card of the previous page to be detached from the DOM """
+        if old_card is None:
+            return
+        try:
+            WebDriverWait(self.driver, self.pacer.timeout, poll_frequency=self.pacer.poll_interval).until(
+                EC.staleness_of(old_card)
+            )
+        except TimeoutException:
+            print("Timed out waiting for next page")
+            self.pacer.record_failure()
+
     def _refresh_page(self):
         self.scroll_already_refreshed = True
+        self.pacer.record_failure()
+        self.pacer.backoff()
         self.driver.refresh()
-        time.sleep(10)
+        self.wait_for_page_ready()
 
     def next_page(self):
         """ Find and click the next page button with retry logic """
+        cards = self.driver.find_elements(By.CSS_SELECTOR, CARD_SELECTOR)
+        old_card = cards[0] if cards else None
+
         pagination_button = self.driver.find_elements(By.CSS_SELECTOR, '[data-testid="next-page"]')
         if not pagination_button:
             print("No next page button found")
@@ -60,6 +150,7 @@ class Navigator:
         click_result = self._click_next_page(pagination_button)
 
         if click_result:
+            self._wait_for_page_change(old_card)
             return True
         else:
             return self._url_next_page()
@@ -99,7 +190,7 @@ class Navigator:
             
             print(f"Attempting to move to this URL: {new_url}")
             self.driver.get(new_url)
-            time.sleep(10)
+            self.wait_for_page_ready()
             return True
         except Exception as e:
             print(f"URL fallback failed: {e}")
@@ -0,0 +1,50 @@
+import time
+
+class AdaptivePacer:
+    """ Adapts wait timeouts to how fast pages actually load.\n
+        Timeouts follow a moving average of observed load times, consecutive failures
+        widen them and add a back-off pause. Also keeps per-page wait timings,
+        compared against the fixed delays used before (10s page delay + 5 x 8s scrolls). """
+    def __init__(self, min_timeout=5, max_timeout=30, initial_load=3, smoothing=0.3, fixed_page_wait=50):
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.smoothing = smoothing
+        self.avg_load = initial_load
+        self.failures = 0
+        self.fixed_page_wait = fixed_page_wait
+        self.pages = 0
+        self.waited = 0.0
+
+    @property
+    def timeout(self):
+        """ Max time to wait for a condition """
+        timeout = self.avg_load * 3 * (1 + self.failures)
+        return min(self.max_timeout, max(self.min_timeout, timeout))
+
+    @property
+    def poll_interval(self):
+        return min(1.0, max(0.2, self.avg_load / 10))
+
+    def record_load(self, seconds):
+        self.avg_load = (1 - self.smoothing) * self.avg_load + self.smoothing * seconds
+        self.failures = 0
+
+    def record_failure(self):
+        self.failures += 1
+
+    def backoff(self):
+        """ Pause after failures, doubling with each consecutive one """
+        if self.failures:
+            delay = min(self.max_timeout, 2 ** self.failures)
+            print(f'Backing off {delay}s after {self.failures} failures')
+            time.sleep(delay)
+
+    def record_page(self, waited):
+        self.pages += 1
+        self.waited += waited
+        print(f'Page ready in {waited:.1f}s (fixed delays: {self.fixed_page_wait}s, '
+              f'saved {self.fixed_page_wait - waited:.1f}s)')
+
+    def time_saved(self):
+        """ Wall time saved over the fixed delays so far, in minutes """
+        return round((self.fixed_page_wait * self.pages - self.waited) / 60, 2)
@@ -0,0 +1,73 @@
+from collections import deque
+import threading
+import queue
+
+class PagePipeline:
+    """ Parses and saves pages on worker threads while the browser loads the next one.\n
+        Page sources go through a bounded queue, so the driver blocks when workers
+        fall behind. Parsed pages are saved in the order they were submitted.
+        If a save fails, later pages are dropped and the error is raised by submit or close. """
+    def __init__(self, extractor, save, operation, workers=2, max_pending=4):
+        self.extractor = extractor
+        self.save = save
+        self.operation = operation
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._order = deque()
+        self._parsed = {}
+        self._lock = threading.Lock()
+        self._error = None
+        self._closed = False
+        self._threads = [threading.Thread(target=self._work, daemon=True) for _ in range(workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, page, page_source):
+        """ Queue a page source, blocking while max_pending pages wait to be parsed """
+        if self._error is not None:
+            self.close()
+        with self._lock:
+            self._order.append(page)
+        self._queue.put((page, page_source))
+
+    def close(self):
+        """ Wait for queued pages to be parsed and saved, raise the first save error """
+        if not self._closed:
+            self._closed = True
+            for _ in self._threads:
+                self._queue.put(None)
+            for thread in self._threads:
+                thread.join()
+        if self._error is not None:
+            raise self._error
+
+    def _work(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+
+            page, page_source = item
+            try:
+                result = self.extractor.parse_page(page_source, self.operation)
+            except Exception as e:
+                print(f"Error parsing page {page}: {e}")
+                result = ([], 0, 1)
+
+            with self._lock:
+                # After a failed save, keep draining the queue so the driver never blocks
+                if self._error is not None:
+                    continue
+                self._parsed[page] = result
+                try:
+                    self._save_ready_pages()
+                except Exception as e:
+                    print(f"Error saving page {page}: {e}")
+                    self._error = e
+
+    def _save_ready_pages(self):
+        # Save pages in submission order, a page waits for the ones queued before it
+        while self._order and self._order[0] in self._parsed:
+            page = self._order.popleft()
+            data, scrapped_entries, errors = self._parsed.pop(page)
+            print(f'Scraped {len(data)} entries from page {page}')
+            self.save(page, data, scrapped_entries, errors)
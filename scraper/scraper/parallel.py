@@ -0,0 +1,113 @@
+from concurrent.futures import ProcessPoolExecutor
+from scraper.scraper import Scraper
+from scraper.sink import CsvSink
+from scraper.checkpoint import Checkpoint
+from driver import Driver
+import pandas as pd
+import time
+import os
+
+def _scrape_shard(script_date, url, first_page, pages, file_name, operation):
+    """Worker process entry point, scrapes a page range with its own browser"""
+    scraper = Scraper(None, script_date)
+
+    # A shard finished by a previous attempt of this run is kept as is
+    report = scraper.finished_report(file_name)
+    if report is not None:
+        return report
+
+    scraper.driver = Driver().start_driver()
+    return scraper.start(url, pages, file_name, operation, first_page=first_page, resume=True)
+
+class ParallelScraper:
+    def __init__(self, script_date, workers=2):
+        self.script_date = script_date
+        self.workers = workers
+
+    def start(self, url, pages, file_name, operation):
+        """ Split the page range across worker processes, each driving its own browser.\n
+            Shards are merged into data/<date>/<file_name>.csv, deduplicated by listing id.\n
+            Return the same report as Scraper.start. """
+
+        # Used to track the processing time #
+        start_time = time.time()
+
+        shards = self._split_pages(pages)
+        print(f'Scraping {pages} pages across {len(shards)} browsers')
+
+        reports = []
+        failed = []
+        with ProcessPoolExecutor(max_workers=len(shards)) as executor:
+            futures = [
+                executor.submit(
+                    _scrape_shard, self.script_date, url, first_page,
+                    shard_pages, f'{file_name}_shard{index}', operation
+                )
+                for index, (first_page, shard_pages) in enumerate(shards)
+            ]
+            for index, future in enumerate(futures):
+                try:
+                    reports.append(future.result())
+                except Exception as e:
+                    print(f"Error in scraping shard {index}: {e}")
+                    failed.append(index)
+
+        # Keep every shard on disk, so a retry resumes the failed ones and keeps the rest
+        if failed:
+            raise RuntimeError(f"Scraping failed for shards {failed} of {len(shards)}, retry to resume them")
+
+        # Merge shards into the final file #
+        full_file_name = os.path.join('./data', self.script_date, f'{file_name}.csv')
+        entries = self._merge_shards([report['file_name'] for report in reports], full_file_name)
+
+        total_time = round((time.time() - start_time) / 60, 2)
+        report = {
+            'file_name': full_file_name,
+            'entries_scraped': entries,
+            'errors': sum(report['errors'] for report in reports),
+            'total_time': total_time,
+            'time_saved': round(sum(report.get('time_saved', 0) for report in reports), 2)
+        }
+        print(f'Parallel scraping finished: {report}')
+        return report
+
+    def _split_pages(self, pages):
+        """ Split pages 1..N in contiguous (first_page, pages) ranges, one per worker """
+        workers = max(1, min(self.workers, pages))
+        size, remainder = divmod(pages, workers)
+
+        shards = []
+        first_page = 1
+        for index in range(workers):
+            shard_pages = size + (1 if index < remainder else 0)
+            shards.append((first_page, shard_pages))
+            first_page += shard_pages
+        return shards
+
+    def _merge_shards(self, shard_files, full_file_name):
+        """ Concat shard files, drop listings seen in more than one shard and remove the shards.\n
+            Return the number of merged entries. """
+        if not shard_files:
+            raise RuntimeError('No shard to merge')
+
+        # Read as text so the merged file keeps the values exactly as scraped
+        frames = [pd.read_csv(shard, dtype=str, keep_default_na=False) for shard in shard_files]
+        merged = pd.concat(frames, ignore_index=True)
+
+        # Listings can shift between pages while scraping, keep the first occurrence of each id
+        merged = merged[(merged['id'] == '') | ~merged.duplicated(subset='id')]
+
+        # Write aside and rename, the final file only appears once it's complete
+        temp_file_name = f'{full_file_name}.tmp'
+        merged.to_csv(temp_file_name, index=False)
+        os.replace(temp_file_name, full_file_name)
+
+        # Shards are only removed once the merge is safely in place
+        for shard in shard_files:
+            CsvSink(shard, []).remove_journal()
+            Checkpoint(shard).clear()
+            if os.path.exists(shard):
+                os.remove(shard)
+
+        print(f'Merged {len(shard_files)} shards into {full_file_name}')
+        return len(merged)
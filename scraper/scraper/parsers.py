@@ -0,0 +1,220 @@
+from bs4 import BeautifulSoup
+import os
+
+try:
+    import lxml.html
+except ImportError:
+    lxml = None
+
+CARD_SELECTOR = 'div[data-cy="rp-property-cd"]'
+# Results list, cards elsewhere on the page (recommendations, ads) aren't part of the search
+LISTINGS_SELECTOR = 'div.listings-wrapper'
+PAGINATION_SELECTOR = 'nav[data-testid="l-pagination"]'
+NEXT_PAGE_SELECTOR = '[data-testid="next-page"]'
+
+class SoupParser:
+    """ Reference backend: BeautifulSoup with html.parser and one CSS query per field """
+    name = 'html.parser'
+
+    def find_cards(self, page_source):
+        soup = BeautifulSoup(page_source, 'html.parser')
+        listings = soup.select_one(LISTINGS_SELECTOR) or soup
+        return listings.select(CARD_SELECTOR)
+
+    def has_next_page(self, page_source):
+        """ True or False when the pagination says if there's a next page, None without pagination """
+        soup = BeautifulSoup(page_source, 'html.parser')
+        pagination = soup.select_one(PAGINATION_SELECTOR)
+        if pagination is None:
+            return None
+        button = pagination.select_one(NEXT_PAGE_SELECTOR)
+        return button is not None and not _is_disabled(button.get('disabled'), button.get('aria-disabled'))
+
+    def card_fields(self, card):
+        details = self._extract_details(card)
+        return {
+            'id': self._extract_id(card),
+            'link': self._extract_link(card),
+            'title': self._extract_title(card),
+            'address': self._extract_address(card),
+            'price': self._extract_price(card),
+            'additional_costs': self._extract_costs(card),
+            **details
+        }
+
+    def _extract_link(self, card):
+        try:
+            link_element = card.select_one('div > a[itemprop="url"]')
+            return link_element['href'] if link_element else ''
+        except:
+            return ''
+
+    def _extract_id(self, card):
+        try:
+            id_element = card.select_one('div > a[itemprop="url"]')
+            return id_element['data-id'] if id_element else ''
+        except:
+            return ''
+
+    def _extract_title(self, card):
+        try:
+            section = card.select_one('[itemprop="address"]')
+            spans = section.select('span')
+            return spans[0].text if spans else ''
+        except:
+            return ''
+
+    def _extract_address(self, card):
+        try:
+            neighborhood = card.select_one('span[data-cy="rp-cardProperty-location-txt"]')
+            neighborhood = neighborhood.text if neighborhood else ''
+        except:
+            neighborhood = ''
+        
+        try:
+            street = card.select_one('p[data-cy="rp-cardProperty-street-txt"]')
+            street = street.text if street else ''
+        except:
+            street = ''
+        
+        address = f"{street} - {neighborhood}"
+        return address
+
+    def _extract_price(self, card):
+        try:
+            price_element = card.select_one('div[data-cy="rp-cardProperty-price-txt"] > p:first-of-type')
+            return price_element.text if price_element else ''
+        except:
+            return ''
+
+    def _extract_costs(self, card):
+        try:
+            costs_element = card.select_one('div[data-cy="rp-cardProperty-price-txt"] > p:last-of-type')
+            return costs_element.text if costs_element else ''
+        except:
+            return ''
+
+    def _extract_details(self, card):
+        def _get_element_text(selector):
+            try:
+                element = card.select_one(selector)
+                return element.text if element else ''
+            except:
+                return ''
+
+        size = _get_element_text('[data-cy="rp-cardProperty-propertyArea-txt"]')
+        dorms = _get_element_text('[data-cy="rp-cardProperty-bedroomQuantity-txt"]')
+        toilets = _get_element_text('[data-cy="rp-cardProperty-bathroomQuantity-txt"]')
+        garage = _get_element_text('[data-cy="rp-cardProperty-parkingSpacesQuantity-txt"]')
+
+        return {
+            "size": size,
+            "dorms": dorms,
+            "toilets": toilets,
+            "garage": garage
+        }
+
+class LxmlParser:
+    """ Fast backend: lxml parse, cards found with XPath and every field
+        collected in a single walk over each card. Same output as SoupParser. """
+    name = 'lxml'
+
+    details = {
+        'rp-cardProperty-propertyArea-txt': 'size',
+        'rp-cardProperty-bedroomQuantity-txt': 'dorms',
+        'rp-cardProperty-bathroomQuantity-txt': 'toilets',
+        'rp-cardProperty-parkingSpacesQuantity-txt': 'garage'
+    }
+
+    def find_cards(self, page_source):
+        root = self._parse(page_source)
+        if root is None:
+            return []
+
+        # Search only the results list, the whole page when it isn't there
+        listings = root.xpath('//div[contains(concat(" ", normalize-space(@class), " "), " listings-wrapper ")][1]')
+        scope = listings[0] if listings else root
+        return scope.xpath('.//div[@data-cy="rp-property-cd"]')
+
+    def has_next_page(self, page_source):
+        """ Same as SoupParser.has_next_page """
+        root = self._parse(page_source)
+        pagination = root.xpath('//nav[@data-testid="l-pagination"]') if root is not None else []
+        if not pagination:
+            return None
+        buttons = pagination[0].xpath('.//*[@data-testid="next-page"]')
+        return bool(buttons) and not _is_disabled(buttons[0].get('disabled'), buttons[0].get('aria-disabled'))
+
+    def card_fields(self, card):
+        url_link = None
+        address_section = None
+        location = None
+        street = None
+        price_box = None
+        details = {}
+
+        # Keep the first descendant matching each field selector, in document order
+        for element in card.iterdescendants():
+            if not isinstance(element.tag, str):
+                continue
+            tag = element.tag
+            itemprop = element.get('itemprop')
+            data_cy = element.get('data-cy')
+
+            if itemprop == 'url' and tag == 'a' and url_link is None and element.getparent().tag == 'div':
+                url_link = element
+            if itemprop == 'address' and address_section is None:
+                address_section = element
+
+            if data_cy is None:
+                continue
+            if data_cy == 'rp-cardProperty-location-txt' and tag == 'span' and location is None:
+                location = element
+            elif data_cy == 'rp-cardProperty-street-txt' and tag == 'p' and street is None:
+                street = element
+            elif data_cy == 'rp-cardProperty-price-txt' and tag == 'div' and price_box is None:
+                if element.find('p') is not None:
+                    price_box = element
+            elif data_cy in self.details and self.details[data_cy] not in details:
+                details[self.details[data_cy]] = element
+
+        title = ''
+        if address_section is not None:
+            span = next(address_section.iterdescendants('span'), None)
+            title = self._text(span)
+
+        prices = price_box.findall('p') if price_box is not None else []
+
+        return {
+            'id': url_link.get('data-id', '') if url_link is not None else '',
+            'link': url_link.get('href', '') if url_link is not None else '',
+            'title': title,
+            'address': f"{self._text(street)} - {self._text(location)}",
+            'price': self._text(prices[0]) if prices else '',
+            'additional_costs': self._text(prices[-1]) if prices else '',
+            **{field: self._text(details.get(field)) for field in self.details.values()}
+        }
+
+    @staticmethod
+    def _parse(page_source):
+        if not page_source or not page_source.strip():
+            return None
+        try:
+            return lxml.html.fromstring(page_source)
+        except ValueError:
+            # Unicode strings with an encoding declaration must be parsed as bytes
+            return lxml.html.fromstring(page_source.encode('utf-8'))
+
+    @staticmethod
+    def _text(element):
+        return str(element.text_content()) if element is not None else ''
+
+def _is_disabled(disabled, aria_disabled):
+    return disabled is not None or aria_disabled == 'true'
+
+def get_parser(name=None):
+    """ Parser backend by name, defaults to SCRAPER_PARSER or lxml when installed """
+    name = name or os.getenv('SCRAPER_PARSER', 'lxml')
+    if name == 'lxml' and lxml is not None:
+        return LxmlParser()
+    return SoupParser()
@@ -1,72 +1,126 @@
 from scraper.navigator import Navigator
 from scraper.extractor import Extractor
-import pandas as pd
+from scraper.pacing import AdaptivePacer
+from scraper.sink import CsvSink
+from scraper.page_pipeline import PagePipeline
+from scraper.checkpoint import Checkpoint
 import time
+import csv
 import os
 
 class Scraper:
-    def __init__(self, driver, script_date):
+    def __init__(self, driver, script_date, quit_driver=True, parse_workers=0):
         self.script_date = script_date
         self.driver = driver
+        self.quit_driver = quit_driver
+        self.parse_workers = parse_workers
         self.scrapped_entries = 0
         self.errors = 0
-        self.new_page_delay = 10
+        self.pages_visited = 0
+        self.known = None
+        self.reached_known = False
         self.ref_cols = [
             'id', 'link', 'title', 'operation', 'address', 'size',
             'dorms', 'toilets', 'garage', 'price', 'additional_costs', 'scraping_date'
         ]
 
-    def start(self, url, pages, file_name, operation):
+    def start(self, url, pages, file_name, operation, first_page=1, resume=False, known=None):
         """ Main scrapping method.\n
             Save the output file in data folder, return nothing.\n
             URL: URL address to scrap.\n
             pages: number of pages to process.\n
             file_name: provide a name to the output file.\n
             operation: provide a name to the current operation, such as Selling or Renting,
-            which will fill the 'operation' feature in the output file."""
+            which will fill the 'operation' feature in the output file.\n
+            first_page: results page to start from.\n
+            resume: continue from the checkpoint of an unfinished scrape of the same file, if any.\n
+            known: KnownListings of the operation for an incremental scrape, which saves only new or
+            changed cards and stops after a page made mostly of known ones."""
 
         # Initialize extractor
         extractor = Extractor(self.driver)
-        navigator = Navigator(self.driver)
+        pacer = AdaptivePacer()
+        navigator = Navigator(self.driver, pacer)
 
         # Used to track the processing time #
         start_time = time.time()
+        self.known = known
+        self.reached_known = False
 
-        # Access url #
-        self.driver.get(url)
-        
-        # Initialize file 
+        # Initialize file, or pick up where a previous run stopped
         full_file_name = self._initialize_file(file_name)
+        sink = CsvSink(full_file_name, self.ref_cols)
+        checkpoint = Checkpoint(full_file_name)
+        run = {'url': url, 'operation': operation, 'first_page': first_page, 'pages': pages}
+
+        start_page = self._resume(sink, checkpoint, run) if resume else None
+        if start_page is None:
+            sink.initialize()
+            checkpoint.clear()
+            start_page = first_page
+        last_page = first_page + pages - 1
+
+        # Access url #
+        self.driver.get(Navigator.page_url(url, start_page))
+
+        # Parse and save on worker threads while the browser moves on, if enabled
+        page_pipeline = None
+        if self.parse_workers:
+            page_pipeline = PagePipeline(
+                extractor,
+                lambda page, data, entries, errors: self._save_data(sink, checkpoint, run, page, data, entries, errors),
+                operation, workers=self.parse_workers, max_pending=self.parse_workers * 2
+            )
 
         # Scrap each page at once, saving it at the end of each iteration #
-        for page in range(1, pages + 1):
-            print(f'Scraping page {page} of {pages}')
+        for page in range(start_page, last_page + 1):
+            print(f'Scraping page {page} of {last_page}')
+            self.pages_visited += 1
             
 
-            # Page load time
-            time.sleep(self.new_page_delay) 
-
-            # Scroll to bottom loop
+            # Wait for the page to load, then scroll until all cards are rendered
+            page_start = time.time()
+            navigator.wait_for_page_ready()
             scroll_result = navigator.scroll_down()
+            pacer.record_page(time.time() - page_start)
 
             # Run Scrap
-            if scroll_result:
+            if scroll_result and page_pipeline:
+                page_pipeline.submit(page, self.driver.page_source)
+            elif scroll_result:
                 data, scrapped_entries, errors = extractor.scrape_page(operation)
-                self.scrapped_entries += scrapped_entries
-                self.errors += errors
                 print(f'Scraped {len(data)} entries from this page')
-                self._save_data(full_file_name, data)
+                self._save_data(sink, checkpoint, run, page, data, scrapped_entries, errors)
+
+            # Past the new listings, the remaining pages are already in the database
+            if self.reached_known:
+                print('Page made mostly of known listings, stopping incremental scrape')
+                break
 
             # Move to next page
             if not navigator.next_page():
                 break
             print("Moving to next page")
 
-        # Close driver
-        self.driver.quit()
+        # Wait for pending pages
+        if page_pipeline:
+            page_pipeline.close()
+
+        # Mark the output as complete
+        sink.finish()
+        checkpoint.clear()
+
+        # Close driver, unless it's a pooled session
+        if self.quit_driver:
+            self.driver.quit()
 
         # Get summary   
         report = self._get_summary(start_time, full_file_name)
+        report['time_saved'] = pacer.time_saved()
+        print(f'Time saved over fixed delays: {report["time_saved"]} minutes')
+        if known is not None:
+            report['known_skipped'] = known.skipped
+            print(f'Known listings skipped: {known.skipped}')
 
         # Reset counters
         self.scrapped_entries = 0
@@ -75,7 +129,7 @@ class Scraper:
         
     ## ------------------ FILE MANAGEMENT FUNCTIONS ------------------ ##
     def _initialize_file(self, file_name):
-        """ Initialize the output CSV file in the /data \n
+        """ Create the /data folder for the output CSV file \n
             Return full path to the file. """
 
         base_dir = './data'
@@ -83,9 +137,6 @@ class Scraper:
         os.makedirs(data_dir, exist_ok=True)
 
         full_file_name = os.path.join(data_dir, f'{file_name}.csv')
-
-        df = pd.DataFrame(columns=self.ref_cols)
-        df.to_csv(full_file_name, index=False)
         print(f'File initialized at {full_file_name}')
         return full_file_name
    
@@ -105,21 +156,61 @@ class Scraper:
         )
         return report
 
-    def _save_data(self, file_name, data):
-        # Initialize data as df #
-        new_data_df = pd.DataFrame(data)
+    def finished_report(self, file_name):
+        """ Report of an output file a previous run already completed, None if there's none """
+        full_file_name = os.path.join('./data', self.script_date, f'{file_name}.csv')
+        sink = CsvSink(full_file_name, self.ref_cols)
+        if not sink.is_complete():
+            return None
+
+        with open(full_file_name, newline='', encoding='utf-8') as file:
+            entries = max(0, sum(1 for _ in csv.reader(file)) - 1)
+        print(f'{full_file_name} was already scraped, keeping it')
+        return {'file_name': full_file_name, 'entries_scraped': entries, 'errors': 0, 'total_time': 0}
+
+    def _save_data(self, sink, checkpoint, run, page, data, scrapped_entries, errors):
+        # Keep only new or changed cards in incremental scrapes, counting only the rows written
+        if self.known is not None:
+            data, known_fraction = self.known.split(data)
+            scrapped_entries = len(data)
+            if known_fraction >= self.known.stop_fraction:
+                self.reached_known = True
 
         # Append scraping date
-        new_data_df['scraping_date'] = self.script_date
-
-        # Open existent file #
-        existing_df = pd.read_csv(file_name)
-
-        # Append new data to existent one #
-        updated_df = pd.concat([existing_df, new_data_df], ignore_index=True)
-
-        # Overwrite existent file #
-        updated_df.to_csv(file_name, index=False)
-
-
-
+        for row in data:
+            row['scraping_date'] = self.script_date
+
+        # Append only this page, the file is never rewritten #
+        sink.append(page, data)
+        self.scrapped_entries += scrapped_entries
+        self.errors += errors
+
+        # Record progress once the page is safely on disk #
+        if checkpoint is not None:
+            checkpoint.save(
+                **run,
+                last_page=page,
+                next_url=Navigator.page_url(run['url'], page + 1),
+                scrapped_entries=self.scrapped_entries,
+                errors=self.errors
+            )
+
+    def _resume(self, sink, checkpoint, run):
+        """ Restore file and counters from the checkpoint of an unfinished run.\n
+            Return the page to continue from, None to start over. """
+        state = checkpoint.load()
+        if state is None or not sink.is_incomplete():
+            return None
+        if any(state.get(key) != value for key, value in run.items()):
+            print('Checkpoint belongs to a different scrape, starting over')
+            return None
+
+        # Drop anything written after the checkpointed page
+        if sink.recover(state['last_page']) != state['last_page']:
+            print('Output file does not match the checkpoint, starting over')
+            return None
+
+        self.scrapped_entries = state['scrapped_entries']
+        self.errors = state['errors']
+        print(f"Resuming after page {state['last_page']} from {state['next_url']}")
+        return state['last_page'] + 1
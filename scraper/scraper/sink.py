@@ -0,0 +1,101 @@
+import csv
+import io
+import json
+import os
+
+class CsvSink:
+    """ Append-only CSV output, written once per page.\n
+        Each page is appended and fsynced, then committed in a sidecar journal
+        with the file size at that point. Bytes past the last committed size
+        belong to a page cut short by a crash, and are dropped by recover(). """
+    def __init__(self, file_name, columns):
+        self.file_name = file_name
+        self.columns = columns
+        self.journal_name = f'{file_name}.journal'
+
+    def initialize(self):
+        """ Start a new file with just the header """
+        with open(self.file_name, 'w', newline='', encoding='utf-8') as file:
+            csv.writer(file).writerow(self.columns)
+            self._sync(file)
+
+        with open(self.journal_name, 'w') as journal:
+            journal.write(json.dumps({'page': 0, 'offset': os.path.getsize(self.file_name)}) + '\n')
+            self._sync(journal)
+
+    def append(self, page, rows):
+        """ Append a page of rows, then commit it in the journal """
+        buffer = io.StringIO()
+        csv.DictWriter(buffer, fieldnames=self.columns, extrasaction='ignore').writerows(rows)
+
+        with open(self.file_name, 'a', newline='', encoding='utf-8') as file:
+            file.write(buffer.getvalue())
+            self._sync(file)
+
+        self._commit({'page': page, 'offset': os.path.getsize(self.file_name)})
+
+    def finish(self):
+        """ Mark the file as complete """
+        self._commit({'done': True})
+
+    def is_incomplete(self):
+        """ True if a journal exists and the scrape writing it never finished """
+        entries = self._read_journal()
+        return bool(entries) and not entries[-1].get('done')
+
+    def is_complete(self):
+        """ True if the file exists and the scrape writing it finished """
+        entries = self._read_journal()
+        return os.path.exists(self.file_name) and bool(entries) and bool(entries[-1].get('done'))
+
+    def recover(self, page=None):
+        """ Truncate the file to the end of the given committed page, or the last one.\n
+            Return the page kept, None if there's no journal to recover from. """
+        entries = [entry for entry in self._read_journal() if 'page' in entry]
+        if page is not None:
+            entries = [entry for entry in entries if entry['page'] <= page]
+        if not entries or not os.path.exists(self.file_name):
+            return None
+
+        committed = entries[-1]
+        size = os.path.getsize(self.file_name)
+        if size > committed['offset']:
+            print(f'Dropping {size - committed["offset"]} uncommitted bytes from {self.file_name}')
+            with open(self.file_name, 'r+b') as file:
+                file.truncate(committed['offset'])
+                self._sync(file)
+
+        # Forget anything journaled after the page we kept
+        with open(self.journal_name, 'w') as journal:
+            journal.writelines(json.dumps(entry) + '\n' for entry in entries)
+            self._sync(journal)
+
+        return committed['page']
+
+    def remove_journal(self):
+        if os.path.exists(self.journal_name):
+            os.remove(self.journal_name)
+
+    def _commit(self, entry):
+        with open(self.journal_name, 'a') as journal:
+            journal.write(json.dumps(entry) + '\n')
+            self._sync(journal)
+
+    def _read_journal(self):
+        if not os.path.exists(self.journal_name):
+            return []
+
+        entries = []
+        with open(self.journal_name) as journal:
+            for line in journal:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    # A torn last line means that commit never happened
+                    break
+        return entries
+
+    @staticmethod
+    def _sync(file):
+        file.flush()
+        os.fsync(file.fileno())
@@ -0,0 +1,38 @@
+""" Throughput of HttpScraper against the local fixture site, with simulated network latency.\n
+    Run with: python tests/bench_http_scraper.py --pages 40 --delay 0.3 """
+import argparse
+import tempfile
+import time
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fixture_server import FixtureServer, make_app
+from scraper.http_scraper import HttpScraper
+
+def run(pages, delay, concurrency):
+    with FixtureServer(make_app(pages=pages, delay=delay)) as server, tempfile.TemporaryDirectory() as folder:
+        os.chdir(folder)
+        scraper = HttpScraper('2026-01-01', concurrency=concurrency)
+
+        start = time.perf_counter()
+        report = scraper.start(f'{server.url}/imoveis', pages, 'bench', 'Renting')
+        elapsed = time.perf_counter() - start
+    return report['entries_scraped'], elapsed
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark HttpScraper on the fixture site')
+    parser.add_argument('--pages', type=int, default=40)
+    parser.add_argument('--delay', type=float, default=0.3, help='seconds of latency per page')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 8])
+    args = parser.parse_args()
+
+    results = []
+    for concurrency in args.concurrency:
+        entries, elapsed = run(args.pages, args.delay, concurrency)
+        results.append((concurrency, entries, elapsed))
+
+    print(f'\n{args.pages} pages, {args.delay}s latency per page')
+    for concurrency, entries, elapsed in results:
+        print(f'concurrency {concurrency:>2}: {entries} entries in {elapsed:.2f}s, {args.pages / elapsed:.1f} pages/s')
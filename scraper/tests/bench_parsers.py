@@ -0,0 +1,34 @@
+""" Pages per second of each parser backend over the saved pages.\n
+    Run with: python tests/bench_parsers.py --rounds 20 """
+import argparse
+import time
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fixture_server import load_fixture
+from scraper.parsers import SoupParser, LxmlParser
+
+FIXTURES = ['page_first.html', 'page_middle.html', 'page_last.html']
+
+def run(parser, pages, rounds):
+    start = time.perf_counter()
+    cards = 0
+    for _ in range(rounds):
+        for page_source in pages:
+            for card in parser.find_cards(page_source):
+                parser.card_fields(card)
+                cards += 1
+    elapsed = time.perf_counter() - start
+    return len(pages) * rounds / elapsed, cards
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the parser backends on the fixture pages')
+    parser.add_argument('--rounds', type=int, default=20)
+    args = parser.parse_args()
+
+    pages = [load_fixture(name) for name in FIXTURES]
+    for backend in (SoupParser(), LxmlParser()):
+        pages_per_second, cards = run(backend, pages, args.rounds)
+        print(f'{backend.name:>12}: {pages_per_second:.1f} pages/s ({cards} cards)')
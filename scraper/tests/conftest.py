@@ -0,0 +1,6 @@
+import sys
+import os
+
+# Tests import the scraper modules the same way the worker does, from the scraper folder
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
@@ -0,0 +1,80 @@
+""" Local listings site serving the saved pages in tests/fixtures, for offline scraping tests and benchmarks.\n
+    Page 1 is page_first.html, the last page page_last.html and every page in between page_middle.html,
+    chosen through the same 'pagina' query param as the real site.\n
+    Run on its own with: python tests/fixture_server.py --pages 20 --port 8081 """
+from aiohttp import web
+import argparse
+import asyncio
+import threading
+import os
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES_DIR, name), encoding='utf-8') as file:
+        return file.read()
+
+def make_app(pages=5, delay=0.0, empty_pages=(), peers=None):
+    """ pages: number of results pages.\n
+        delay: seconds added to every response, to stand in for network latency.\n
+        empty_pages: pages answered without cards but with a next link, like a blocked or client rendered page.\n
+        peers: set collecting the client address of every request, one per connection. """
+    first, middle, last = (load_fixture(name) for name in ('page_first.html', 'page_middle.html', 'page_last.html'))
+    empty = '<html><body><nav data-testid="l-pagination"><button data-testid="next-page">Próxima</button></nav></body></html>'
+    app = web.Application()
+
+    async def listings(request):
+        if peers is not None:
+            peers.add(request.transport.get_extra_info('peername'))
+        if delay:
+            await asyncio.sleep(delay)
+
+        page = int(request.query.get('pagina', 1))
+        if page in empty_pages:
+            body = empty
+        elif page == 1:
+            body = first
+        elif page < pages:
+            body = middle
+        elif page == pages:
+            body = last
+        else:
+            raise web.HTTPNotFound()
+        return web.Response(text=body, content_type='text/html')
+
+    app.router.add_get('/imoveis', listings)
+    return app
+
+class FixtureServer:
+    """ Runs an aiohttp app on a free local port in a background thread """
+    def __init__(self, app):
+        self.app = app
+        self.url = None
+        self._loop = asyncio.new_event_loop()
+        self._runner = web.AppRunner(app)
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        port = asyncio.run_coroutine_threadsafe(self._start(), self._loop).result()
+        self.url = f'http://127.0.0.1:{port}'
+        return self
+
+    def __exit__(self, *exc):
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+    async def _start(self):
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, '127.0.0.1', 0)
+        await site.start()
+        return site._server.sockets[0].getsockname()[1]
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve the saved listings pages')
+    parser.add_argument('--pages', type=int, default=5)
+    parser.add_argument('--delay', type=float, default=0.0)
+    parser.add_argument('--port', type=int, default=8081)
+    args = parser.parse_args()
+    web.run_app(make_app(args.pages, args.delay), host='127.0.0.1', port=args.port)
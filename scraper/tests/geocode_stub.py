@@ -0,0 +1,59 @@
+""" Local stand-in for the LocationIQ search endpoint, for offline geocoder tests and benchmarks.\n
+    Answers like the provider: a JSON list with lat/lon, 404 when nothing matches (addresses
+    containing 'nowhere'), and 429 when more than rate requests arrive within a second.\n
+    Run on its own with: python tests/geocode_stub.py --rate 2 --port 8082 """
+from aiohttp import web
+import argparse
+import hashlib
+import time
+
+def coordinates(address):
+    """ Stable fake coordinates around São Paulo for an address """
+    digest = hashlib.sha1(address.encode()).digest()
+    return -23.5 - digest[0] / 2550, -46.6 - digest[1] / 2550
+
+class GeocodeStub:
+    """ rate: requests per second allowed before answering 429, one extra request of burst is tolerated.\n
+        throttle_first: answer 429 to the first request of every address, to exercise retries.\n
+        malformed: addresses answered with a body that isn't the expected JSON. """
+    def __init__(self, rate=2, throttle_first=False, malformed=()):
+        self.rate = rate
+        self.throttle_first = throttle_first
+        self.malformed = set(malformed)
+        self.arrivals = []
+        self.throttled = 0
+        self.seen = set()
+
+    def make_app(self):
+        app = web.Application()
+        app.router.add_get('/v1/search', self.search)
+        return app
+
+    async def search(self, request):
+        now = time.monotonic()
+        self.arrivals.append(now)
+        address = request.query.get('q', '')
+
+        recent = [arrival for arrival in self.arrivals if arrival > now - 1]
+        if len(recent) > self.rate + 1:
+            self.throttled += 1
+            return web.json_response({'error': 'Rate Limited Second'}, status=429, headers={'Retry-After': '1'})
+
+        if self.throttle_first and address not in self.seen:
+            self.seen.add(address)
+            return web.json_response({'error': 'Rate Limited Second'}, status=429, headers={'Retry-After': '0'})
+
+        if address in self.malformed:
+            return web.Response(text='<html>Bad gateway</html>', content_type='text/html')
+        if 'nowhere' in address.lower():
+            return web.json_response({'error': 'Unable to geocode'}, status=404)
+
+        lat, lon = coordinates(address)
+        return web.json_response([{'lat': str(lat), 'lon': str(lon), 'display_name': address}])
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve a fake LocationIQ search endpoint')
+    parser.add_argument('--rate', type=float, default=2)
+    parser.add_argument('--port', type=int, default=8082)
+    args = parser.parse_args()
+    web.run_app(GeocodeStub(args.rate).make_app(), host='127.0.0.1', port=args.port)
@@ -0,0 +1,57 @@
+""" AsyncGeocoder against the local geocoding stub: results, rate limit compliance and retries """
+import pytest
+
+pytest.importorskip('aiohttp')
+
+import time
+from fixture_server import FixtureServer
+from geocode_stub import GeocodeStub, coordinates
+from geocoder import AsyncGeocoder
+
+ADDRESSES = [f'Rua {number}, Pinheiros, São Paulo' for number in range(12)]
+
+def geocoder(server, rate, **kwargs):
+    return AsyncGeocoder(f'{server.url}/v1/search', 'test-key', rate=rate, concurrency=4, **kwargs)
+
+def test_resolves_addresses_and_misses():
+    stub = GeocodeStub(rate=50)
+    with FixtureServer(stub.make_app()) as server:
+        results = geocoder(server, 50).geocode(ADDRESSES + ['Nowhere street, São Paulo'])
+
+    assert results['Nowhere street, São Paulo'] is None
+    for address in ADDRESSES:
+        assert results[address] == pytest.approx(coordinates(address))
+
+def test_stays_within_the_provider_rate():
+    rate = 8
+    stub = GeocodeStub(rate=rate)
+    with FixtureServer(stub.make_app()) as server:
+        start = time.monotonic()
+        results = geocoder(server, rate).geocode(ADDRESSES)
+        elapsed = time.monotonic() - start
+
+    assert len(results) == len(ADDRESSES)
+    assert stub.throttled == 0
+    assert elapsed >= (len(ADDRESSES) - 1) / rate * 0.9
+
+def test_retries_rate_limited_requests():
+    stub = GeocodeStub(rate=50, throttle_first=True)
+    with FixtureServer(stub.make_app()) as server:
+        client = geocoder(server, 50)
+        results = client.geocode(ADDRESSES)
+
+    assert len(results) == len(ADDRESSES)
+    assert client.retries == len(ADDRESSES)
+
+def test_malformed_response_fails_only_that_address():
+    bad = ADDRESSES[0]
+    stub = GeocodeStub(rate=50, malformed={bad})
+    completed = []
+    with FixtureServer(stub.make_app()) as server:
+        client = geocoder(server, 50, max_retries=1)
+        client._backoff = lambda attempt, retry_after=None: 0
+        results = client.geocode(ADDRESSES, on_result=lambda address, result: completed.append(address))
+
+    assert bad not in results
+    assert client.errors == 1
+    assert sorted(completed) == sorted(ADDRESSES[1:])
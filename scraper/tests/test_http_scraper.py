@@ -0,0 +1,68 @@
+""" HttpScraper against the local fixture site, no network or browser needed """
+import pytest
+
+pytest.importorskip('aiohttp')
+pytest.importorskip('selenium')
+
+import csv
+from fixture_server import FixtureServer, make_app
+from scraper.http_scraper import HttpScraper
+
+CARDS_PER_PAGE = 30
+
+class SkipFirstCards:
+    """ Stands in for KnownListings, taking the first cards of every page as known and unchanged """
+    def __init__(self, count):
+        self.count = count
+        self.stop_fraction = 1.0
+        self.skipped = 0
+
+    def split(self, cards):
+        self.skipped += min(self.count, len(cards))
+        return cards[self.count:], min(self.count, len(cards)) / len(cards)
+
+def scrape(server, pages, monkeypatch, tmp_path, known=None):
+    monkeypatch.chdir(tmp_path)
+    scraper = HttpScraper('2026-01-01')
+    return scraper, scraper.start(f'{server.url}/imoveis?tipo=apartamento', pages, 'listings', 'Renting', known=known)
+
+def test_scrapes_every_page_over_http(monkeypatch, tmp_path):
+    with FixtureServer(make_app(pages=5)) as server:
+        scraper, report = scrape(server, 5, monkeypatch, tmp_path)
+
+    assert report['entries_scraped'] == 5 * CARDS_PER_PAGE
+    assert scraper.http_pages == 5
+    assert scraper.browser_pages == 0
+
+def test_known_listings_are_not_counted_as_scraped(monkeypatch, tmp_path):
+    with FixtureServer(make_app(pages=5)) as server:
+        scraper, report = scrape(server, 5, monkeypatch, tmp_path, known=SkipFirstCards(10))
+
+    with open(report['file_name'], newline='', encoding='utf-8') as file:
+        rows = list(csv.DictReader(file))
+    assert report['entries_scraped'] == len(rows) == 5 * (CARDS_PER_PAGE - 10)
+    assert report['known_skipped'] == 5 * 10
+
+def test_reuses_connections_across_batches(monkeypatch, tmp_path):
+    # 20 pages take several batches, all served by the same keep-alive connections
+    peers = set()
+    with FixtureServer(make_app(pages=20, peers=peers)) as server:
+        scraper, report = scrape(server, 20, monkeypatch, tmp_path)
+
+    assert report['entries_scraped'] == 20 * CARDS_PER_PAGE
+    assert len(peers) <= scraper.fetcher.concurrency
+
+def test_stops_at_the_last_results_page(monkeypatch, tmp_path):
+    # Asking for more pages than the site has ends at the page without a next link
+    with FixtureServer(make_app(pages=3)) as server:
+        scraper, report = scrape(server, 10, monkeypatch, tmp_path)
+
+    assert report['entries_scraped'] == 3 * CARDS_PER_PAGE
+
+def test_empty_page_in_the_middle_fails_instead_of_truncating(monkeypatch, tmp_path):
+    with FixtureServer(make_app(pages=5, empty_pages={3})) as server:
+        # Stand in for the browser, which doesn't find cards either
+        monkeypatch.setattr(HttpScraper, '_scrape_with_browser',
+                            lambda self, page_url, operation: ([], 0, 0, None))
+        with pytest.raises(RuntimeError):
+            scrape(server, 5, monkeypatch, tmp_path)
@@ -0,0 +1,51 @@
+""" The lxml backend must give the same output as the BeautifulSoup reference on saved pages """
+import pytest
+
+pytest.importorskip('lxml')
+
+from fixture_server import load_fixture
+from scraper.parsers import SoupParser, LxmlParser
+
+FIXTURES = ['page_first.html', 'page_middle.html', 'page_last.html']
+CARDS_PER_PAGE = 30
+
+def parse(parser, page_source):
+    return [parser.card_fields(card) for card in parser.find_cards(page_source)]
+
+@pytest.mark.parametrize('fixture', FIXTURES)
+def test_lxml_matches_soup(fixture):
+    page_source = load_fixture(fixture)
+    expected = parse(SoupParser(), page_source)
+
+    assert len(expected) == CARDS_PER_PAGE
+    assert parse(LxmlParser(), page_source) == expected
+
+@pytest.mark.parametrize('fixture', FIXTURES)
+def test_recommendations_outside_the_results_are_skipped(fixture):
+    page_source = load_fixture(fixture)
+    for parser in (SoupParser(), LxmlParser()):
+        ids = [fields['id'] for fields in parse(parser, page_source)]
+        assert '2799990001' not in ids
+
+def test_page_without_results_container_searches_whole_page():
+    page_source = load_fixture('page_middle.html').replace('listings-wrapper', 'other-wrapper')
+    expected = parse(SoupParser(), page_source)
+
+    assert len(expected) == CARDS_PER_PAGE + 1
+    assert parse(LxmlParser(), page_source) == expected
+
+@pytest.mark.parametrize('fixture, has_next', [
+    ('page_first.html', True),
+    ('page_middle.html', True),
+    ('page_last.html', False),
+])
+def test_next_page_signal(fixture, has_next):
+    page_source = load_fixture(fixture)
+    assert SoupParser().has_next_page(page_source) is has_next
+    assert LxmlParser().has_next_page(page_source) is has_next
+
+def test_pages_without_pagination_give_no_signal():
+    page_source = '<html><body><div class="listings-wrapper"></div></body></html>'
+    assert SoupParser().has_next_page(page_source) is None
+    assert LxmlParser().has_next_page(page_source) is None
+    assert LxmlParser().find_cards('') == []